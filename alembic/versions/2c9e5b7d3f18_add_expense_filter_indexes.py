@@ -0,0 +1,34 @@
+"""add_expense_filter_indexes
+
+Revision ID: 2c9e5b7d3f18
+Revises: f4c81d2e9a60
+Create Date: 2026-10-18 18:21:07.358192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c9e5b7d3f18'
+down_revision: Union[str, Sequence[str], None] = 'f4c81d2e9a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Extending (user_id, category, date) with id lets a category filter walk
+    # the index in keyset order instead of sorting; the amount sort needs its own
+    op.create_index('ix_expenses_user_id_category_date_id', 'expenses', ['user_id', 'category', 'date', 'id'], unique=False)
+    op.drop_index('ix_expenses_user_id_category_date', table_name='expenses')
+    op.create_index('ix_expenses_user_id_amount_id', 'expenses', ['user_id', 'amount', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_user_id_amount_id', table_name='expenses')
+    op.create_index('ix_expenses_user_id_category_date', 'expenses', ['user_id', 'category', 'date'], unique=False)
+    op.drop_index('ix_expenses_user_id_category_date_id', table_name='expenses')
@@ -0,0 +1,76 @@
+"""decode_base64_blobs
+
+Revision ID: 5e3d9c1a7b40
+Revises: 9a6e3b1c7d52
+Create Date: 2026-10-18 21:05:42.193806
+
+"""
+import base64
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.blobstore import get_blob_store
+from app.media import decode_image_payload
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e3d9c1a7b40'
+down_revision: Union[str, Sequence[str], None] = '9a6e3b1c7d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, reference column)
+BLOB_REFS = [
+    ('expenses', 'receipt_ref'),
+    ('expense_items', 'image_ref'),
+    ('users', 'profile_image_ref'),
+]
+
+
+def _is_text(data):
+    try:
+        data.decode('utf-8')
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _rewrite(name, ref_col, convert):
+    # Blobs are content-addressed, so a converted blob gets a new key and the
+    # row is repointed; the old blob stays for any other row sharing it
+    bind = op.get_bind()
+    store = get_blob_store()
+    t = sa.table(name, sa.column('id', sa.String), sa.column(ref_col, sa.String))
+    rows = bind.execute(sa.select(t.c.id, t.c[ref_col]).where(t.c[ref_col].isnot(None))).all()
+    for row_id, ref in rows:
+        data = store.get(ref)
+        converted = convert(data) if data else None
+        if converted is not None:
+            bind.execute(t.update().where(t.c.id == row_id).values({ref_col: store.put(converted)}))
+
+
+def _decode(data):
+    raw, was_base64 = decode_image_payload(data)
+    return raw if was_base64 else None
+
+
+def _encode(data):
+    # Before this revision responses sent the stored bytes as UTF-8 text
+    return None if _is_text(data) else base64.b64encode(data)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Images uploaded as base64 were stored verbatim; the store now keeps raw
+    # image bytes so downloads can serve them directly
+    for name, ref_col in BLOB_REFS:
+        _rewrite(name, ref_col, _decode)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, ref_col in reversed(BLOB_REFS):
+        _rewrite(name, ref_col, _encode)
@@ -0,0 +1,30 @@
+"""add_summary_indexes
+
+Revision ID: 6b1d0e8f4a27
+Revises: a3f7c9e2b184
+Create Date: 2026-10-18 16:02:11.730425
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1d0e8f4a27'
+down_revision: Union[str, Sequence[str], None] = 'a3f7c9e2b184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_user_id_category_date', 'expenses', ['user_id', 'category', 'date'], unique=False)
+    op.create_index('ix_splits_expense_id_name', 'splits', ['expense_id', 'name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_splits_expense_id_name', table_name='splits')
+    op.drop_index('ix_expenses_user_id_category_date', table_name='expenses')
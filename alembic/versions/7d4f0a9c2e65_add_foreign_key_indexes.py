@@ -0,0 +1,33 @@
+"""add_foreign_key_indexes
+
+Revision ID: 7d4f0a9c2e65
+Revises: 2c9e5b7d3f18
+Create Date: 2026-10-18 18:57:42.804116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4f0a9c2e65'
+down_revision: Union[str, Sequence[str], None] = '2c9e5b7d3f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # expenses/friends/saved_items.user_id and splits.expense_id are already
+    # the leading column of composite indexes from earlier revisions; these
+    # are the foreign keys still left uncovered (see app.index_audit)
+    op.create_index(op.f('ix_expense_items_expense_id'), 'expense_items', ['expense_id'], unique=False)
+    op.create_index(op.f('ix_notification_outbox_user_id'), 'notification_outbox', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_notification_outbox_user_id'), table_name='notification_outbox')
+    op.drop_index(op.f('ix_expense_items_expense_id'), table_name='expense_items')
@@ -0,0 +1,49 @@
+"""add_expense_rollups
+
+Revision ID: 8e2a4c6f1b93
+Revises: 6b1d0e8f4a27
+Create Date: 2026-10-18 16:48:37.105264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2a4c6f1b93'
+down_revision: Union[str, Sequence[str], None] = '6b1d0e8f4a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'expense_rollups',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('month', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+    )
+
+    # Backfill; same as `python -m app.rollups rebuild`
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "to_char(date, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', date)"
+    op.execute(
+        f"INSERT INTO expense_rollups (user_id, month, category, total, count) "
+        f"SELECT user_id, {month}, category, SUM(amount), COUNT(id) FROM expenses "
+        f"WHERE user_id IS NOT NULL AND date IS NOT NULL AND category IS NOT NULL "
+        f"GROUP BY user_id, {month}, category"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('expense_rollups')
@@ -0,0 +1,40 @@
+"""add_expense_paid_by
+
+Revision ID: 9a6e3b1c7d52
+Revises: 7d4f0a9c2e65
+Create Date: 2026-10-18 19:40:16.275938
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import install_sqlite_index, drop_sqlite_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6e3b1c7d52'
+down_revision: Union[str, Sequence[str], None] = '7d4f0a9c2e65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL keeps existing expenses paid by their owner
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('paid_by', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # On SQLite the batch op rebuilds expenses, which the search triggers
+    # reference; take the search index down around it and rebuild it after
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        drop_sqlite_index(bind)
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_column('paid_by')
+    if bind.dialect.name == 'sqlite':
+        install_sqlite_index(bind)
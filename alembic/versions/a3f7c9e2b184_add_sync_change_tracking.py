@@ -0,0 +1,58 @@
+"""add_sync_change_tracking
+
+Revision ID: a3f7c9e2b184
+Revises: d9b4e6a13c58
+Create Date: 2026-10-18 15:20:31.482913
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f7c9e2b184'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e6a13c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('expenses', 'friends', 'saved_items')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows count as changed now: clients pick them up on their first
+    # full sync anyway
+    now = datetime.utcnow()
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.text(f"UPDATE {table} SET updated_at = :now").bindparams(now=now))
+        op.create_index(f'ix_{table}_user_id_updated_at', table, ['user_id', 'updated_at'], unique=False)
+
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('resource', sa.String(), nullable=True),
+        sa.Column('resource_id', sa.String(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tombstones_id'), 'tombstones', ['id'], unique=False)
+    op.create_index('ix_tombstones_user_id_deleted_at', 'tombstones', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tombstones_user_id_deleted_at', table_name='tombstones')
+    op.drop_index(op.f('ix_tombstones_id'), table_name='tombstones')
+    op.drop_table('tombstones')
+
+    for table in reversed(SYNCED_TABLES):
+        op.drop_index(f'ix_{table}_user_id_updated_at', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,32 @@
+"""add_pagination_indexes
+
+Revision ID: b7e3c1a9d2f4
+Revises: e1aa7dc53b66
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3c1a9d2f4'
+down_revision: Union[str, Sequence[str], None] = 'e1aa7dc53b66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_user_id_date_id', 'expenses', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_friends_user_id_name_id', 'friends', ['user_id', 'name', 'id'], unique=False)
+    op.create_index('ix_saved_items_user_id_name_id', 'saved_items', ['user_id', 'name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_saved_items_user_id_name_id', table_name='saved_items')
+    op.drop_index('ix_friends_user_id_name_id', table_name='friends')
+    op.drop_index('ix_expenses_user_id_date_id', table_name='expenses')
@@ -0,0 +1,81 @@
+"""move_images_to_blob_store
+
+Revision ID: c5a2f8e41d07
+Revises: b7e3c1a9d2f4
+Create Date: 2026-10-18 11:40:08.517334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.blobstore import get_blob_store
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a2f8e41d07'
+down_revision: Union[str, Sequence[str], None] = 'b7e3c1a9d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, bytes column, reference column)
+BLOB_COLUMNS = [
+    ('expenses', 'receipt_data', 'receipt_ref'),
+    ('expense_items', 'image_data', 'image_ref'),
+    ('users', 'profile_image_data', 'profile_image_ref'),
+]
+
+
+def _table(name, data_col, ref_col):
+    return sa.table(
+        name,
+        sa.column('id', sa.String),
+        sa.column(data_col, sa.LargeBinary),
+        sa.column(ref_col, sa.String),
+    )
+
+
+def _move_to_store(name, data_col, ref_col):
+    bind = op.get_bind()
+    store = get_blob_store()
+    t = _table(name, data_col, ref_col)
+    ids = bind.execute(sa.select(t.c.id).where(t.c[data_col].isnot(None))).scalars().all()
+    # One row at a time so only a single image is ever held in memory
+    for row_id in ids:
+        data = bind.execute(sa.select(t.c[data_col]).where(t.c.id == row_id)).scalar()
+        bind.execute(t.update().where(t.c.id == row_id).values({ref_col: store.put(data)}))
+
+
+def _move_from_store(name, data_col, ref_col):
+    bind = op.get_bind()
+    store = get_blob_store()
+    t = _table(name, data_col, ref_col)
+    rows = bind.execute(sa.select(t.c.id, t.c[ref_col]).where(t.c[ref_col].isnot(None))).all()
+    for row_id, ref in rows:
+        bind.execute(t.update().where(t.c.id == row_id).values({data_col: store.get(ref)}))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, data_col, ref_col in BLOB_COLUMNS:
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(ref_col, sa.String(), nullable=True))
+
+        _move_to_store(name, data_col, ref_col)
+
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.drop_column(data_col)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, data_col, ref_col in reversed(BLOB_COLUMNS):
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(data_col, sa.LargeBinary(), nullable=True))
+
+        _move_from_store(name, data_col, ref_col)
+
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.drop_column(ref_col)
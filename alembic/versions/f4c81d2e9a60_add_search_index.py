@@ -0,0 +1,53 @@
+"""add_search_index
+
+Revision ID: f4c81d2e9a60
+Revises: 8e2a4c6f1b93
+Create Date: 2026-10-18 17:34:52.619047
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import install_sqlite_index, drop_sqlite_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c81d2e9a60'
+down_revision: Union[str, Sequence[str], None] = '8e2a4c6f1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCHED_COLUMNS = (('expenses', 'title'), ('expense_items', 'name'), ('saved_items', 'name'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # FTS5 table plus sync triggers, populated from the existing rows
+        install_sqlite_index(bind)
+    elif bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table, column in SEARCHED_COLUMNS:
+            op.create_index(
+                f'ix_{table}_{column}_tsv', table,
+                [sa.text(f"to_tsvector('simple', coalesce({column}, ''))")],
+                postgresql_using='gin'
+            )
+            op.create_index(
+                f'ix_{table}_{column}_trgm', table, [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        drop_sqlite_index(bind)
+    elif bind.dialect.name == 'postgresql':
+        for table, column in reversed(SEARCHED_COLUMNS):
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
+            op.drop_index(f'ix_{table}_{column}_tsv', table_name=table)
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,13 +15,30 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 REFRESH_TOKEN_EXPIRE_DAYS = 30  # 30 days
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2 cost parameters; passlib's defaults apply when these are unset
+ARGON2_SETTINGS = {
+    "argon2__rounds": os.getenv("ARGON2_TIME_COST"),
+    "argon2__memory_cost": os.getenv("ARGON2_MEMORY_COST"),
+    "argon2__parallelism": os.getenv("ARGON2_PARALLELISM"),
+}
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{key: int(value) for key, value in ARGON2_SETTINGS.items() if value},
+)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+# Hashing is deliberately slow (tens of ms) and argon2 releases the GIL, so it
+# runs on a small dedicated pool. That keeps it off the event loop and bounds
+# how many hashes a worker computes at once during a login burst.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+async def verify_password_async(plain_password, hashed_password):
+    return await asyncio.wrap_future(hash_pool.submit(pwd_context.verify, plain_password, hashed_password))
+
+async def get_password_hash_async(password):
+    return await asyncio.wrap_future(hash_pool.submit(pwd_context.hash, password))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -0,0 +1,81 @@
+import heapq
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Who owes whom across a user's expenses. Participants are identified by split
+# name; the account owner is SELF. Every split owes its share to the expense's
+# payer (paid_by, or the owner when unset). Balances are summed in SQL, so the
+# cost is one aggregate query however many splits there are; only the settle
+# step runs in Python, over one entry per participant.
+
+SELF = "You"
+
+def split_shares(user_id: str):
+    # (payer, name, share) per split of the user's expenses. A split without
+    # an amount gets an equal share of its expense.
+    split_counts = (
+        select(models.Split.expense_id, func.count().label("splits"))
+        .join(models.Expense, models.Expense.id == models.Split.expense_id)
+        .where(models.Expense.user_id == user_id)
+        .group_by(models.Split.expense_id)
+        .subquery()
+    )
+    return (
+        select(
+            func.coalesce(models.Expense.paid_by, literal(SELF)).label("payer"),
+            models.Split.name.label("name"),
+            func.coalesce(models.Split.amount, models.Expense.amount / split_counts.c.splits).label("share"),
+        )
+        .join(models.Split, models.Split.expense_id == models.Expense.id)
+        .join(split_counts, split_counts.c.expense_id == models.Expense.id)
+        .where(models.Expense.user_id == user_id)
+        .subquery()
+    )
+
+def get_balances(db: Session, user_id: str):
+    # Net balance per participant, largest creditor first: [(name, balance)].
+    # Positive means they are owed money.
+    shares = split_shares(user_id)
+    movements = union_all(
+        select(shares.c.payer.label("name"), shares.c.share.label("delta")),
+        select(shares.c.name.label("name"), (-shares.c.share).label("delta")),
+    ).subquery()
+    rows = db.execute(
+        select(movements.c.name, func.sum(movements.c.delta).label("balance"))
+        .group_by(movements.c.name)
+        .order_by(func.sum(movements.c.delta).desc(), movements.c.name)
+    ).all()
+    return [(name, round(balance or 0.0, 2)) for name, balance in rows]
+
+def settle(balances):
+    # Greedy min-cash-flow: the largest debtor pays the largest creditor as
+    # much as either can, until everyone is square. Each round settles at
+    # least one participant, so there are at most n - 1 transfers. Works in
+    # cents to keep float dust out of the result. [(debtor, creditor, amount)]
+    creditors, debtors = [], []
+    for name, balance in balances:
+        cents = round(balance * 100)
+        if cents > 0:
+            creditors.append((-cents, name))
+        elif cents < 0:
+            debtors.append((cents, name))
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount / 100))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+def get_settlement(db: Session, user_id: str):
+    return settle(get_balances(db, user_id))
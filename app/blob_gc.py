@@ -0,0 +1,62 @@
+import argparse
+import os
+import time
+
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+
+from . import models, database
+from .blobstore import get_blob_store
+from .images import thumbnail_ref
+
+# Deletes blobs no row points at any more. Blobs are content-addressed and
+# shared between rows, so deleting or replacing an image only drops a
+# reference; this sweep removes what nothing references, plus its thumbnail.
+#
+#     python -m app.blob_gc [--dry-run]
+#
+# Ingest writes a blob before the row that references it commits, so blobs
+# younger than BLOB_GC_GRACE_SECONDS are left alone.
+
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", 24 * 3600))
+
+def live_refs(db: Session):
+    outbox = models.NotificationOutbox
+    refs = db.execute(union(
+        select(models.Expense.receipt_ref),
+        select(models.ExpenseItem.image_ref),
+        select(models.User.profile_image_ref),
+        # Attachments of notifications that may still be (re)sent
+        select(outbox.attachment_ref).where(outbox.status != "sent"),
+    )).scalars()
+    live = set()
+    for ref in refs:
+        if ref:
+            live.update((ref, thumbnail_ref(ref)))
+    return live
+
+def collect(db: Session, store=None, grace_seconds: int = BLOB_GC_GRACE_SECONDS, dry_run: bool = False):
+    # Returns the keys of the unreferenced blobs that were (or would be) deleted
+    store = store or get_blob_store()
+    live = live_refs(db)
+    cutoff = time.time() - grace_seconds
+    orphans = [key for key, modified in store.iter_blobs() if key not in live and modified < cutoff]
+    if not dry_run:
+        for key in orphans:
+            store.delete(key)
+    return orphans
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.blob_gc")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the blobs that would be deleted")
+    args = parser.parse_args(argv)
+
+    db = database.SessionLocal()
+    try:
+        orphans = collect(db, dry_run=args.dry_run)
+        print(f"✅ {'Found' if args.dry_run else 'Deleted'} {len(orphans)} unreferenced blobs")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import re
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Receipts, item photos and profile images live outside the database. Rows
+# only keep a reference (the blob key) so Postgres rows, TOAST, vacuum and
+# backups stay small. Keys are the SHA-256 of the content, which makes writes
+# idempotent, de-duplicates identical uploads and doubles as a strong ETag.
+
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "./blobs")
+CHUNK_SIZE = 64 * 1024
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def blob_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class BlobStore:
+    def put(self, data: bytes, key: str = None) -> str:
+        # Stores under the content hash unless a key is given (derived blobs
+        # such as thumbnails use a key computed from their source's key)
+        raise NotImplementedError
+
+    def open(self, key: str):
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        # Yields (key, modified timestamp) for every stored blob
+        raise NotImplementedError
+
+    def check(self):
+        # Raises at startup if the store can't be written to
+        pass
+
+    def get(self, key: str):
+        if not key or not self.exists(key):
+            return None
+        with self.open(key) as f:
+            return f.read()
+
+    def iter_chunks(self, key: str, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+        # Yields bytes [start, end] inclusive, or to the end of the blob
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        if not _KEY_PATTERN.match(key or ""):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        # Fan out over two directory levels so no single directory gets huge
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes, key: str = None) -> str:
+        key = key or blob_key(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return key
+
+    def open(self, key: str):
+        return open(self._path(key), "rb")
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_blobs(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                # Skips in-flight .tmp- files
+                if _KEY_PATTERN.match(name):
+                    yield name, os.path.getmtime(os.path.join(directory, name))
+
+    def check(self):
+        # Serverless hosts (Vercel included) have a read-only filesystem:
+        # BLOB_STORE_PATH must be a writable, persistent volume
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            raise RuntimeError(f"BLOB_STORE_PATH {self.root} can't be created: {e}") from e
+        if not os.access(self.root, os.W_OK):
+            raise RuntimeError(f"BLOB_STORE_PATH {self.root} is not writable")
+
+_BACKENDS = {
+    "local": lambda: LocalBlobStore(BLOB_STORE_PATH),
+}
+
+_store = None
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        if BLOB_STORE_BACKEND not in _BACKENDS:
+            raise RuntimeError(f"Unknown BLOB_STORE_BACKEND: {BLOB_STORE_BACKEND}")
+        store = _BACKENDS[BLOB_STORE_BACKEND]()
+        store.check()
+        _store = store
+    return _store
+
+def blob_property(ref_attr: str):
+    # Exposes a *_ref column as raw bytes, so schemas can keep reading
+    # receipt_data / image_data / profile_image_data as before. Writes go
+    # through the ref (see images.ingest_image).
+    def getter(self):
+        ref = getattr(self, ref_attr)
+        return get_blob_store().get(ref) if ref else None
+
+    return property(getter)
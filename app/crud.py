@@ -1,13 +1,50 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import Session, load_only, selectinload, joinedload, lazyload
 from . import models, schemas
-from .auth import get_password_hash
+from .pagination import decode_cursor
+from .cache import user_cache
+from .images import ingest_image
+from . import rollups, suggest
+from .blobstore import blob_key, get_blob_store
+from .media import decode_image_payload
+from datetime import datetime, timedelta
+import json
+import os
 import uuid
+from types import SimpleNamespace
+
+# How an expense's splits/items collections are loaded. "selectin" fetches the
+# children of a whole page in one extra query per collection; "joined" folds
+# them into the parent SELECT; "lazy" is the old one-query-per-row behaviour.
+EXPENSE_LOAD_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "lazy": lazyload,
+}
+DEFAULT_EXPENSE_LOAD_STRATEGY = os.getenv("EXPENSE_LOAD_STRATEGY", "selectin")
+
+def expense_load_options(strategy: str = None):
+    loader = EXPENSE_LOAD_STRATEGIES[strategy or DEFAULT_EXPENSE_LOAD_STRATEGY]
+    return [loader(models.Expense.splits), loader(models.Expense.items)]
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def get_auth_user_by_email(db: Session, email: str):
+    # Authentication only needs the identity columns, not the profile image
+    return (
+        db.query(models.User)
+        .options(load_only(models.User.id, models.User.email, models.User.is_active, models.User.username, models.User.subtitle))
+        .filter(models.User.email == email)
+        .first()
+    )
+
+def get_user(db: Session, user_id: str):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    # The caller hashes the password (auth.get_password_hash_async) before
+    # opening the transaction
     # Default username from email if not provided (though our schema currently doesn't ask for it)
     username = user.email.split("@")[0].capitalize()
     db_user = models.User(
@@ -21,7 +58,13 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: str, user_update: schemas.UserUpdate):
+def store_profile_image(data: bytes):
+    # Blob write for a profile image upload; like ingest_expense_images, async
+    # callers do this in the threadpool and hand update_user the ref
+    raw, _ = decode_image_payload(data)
+    return get_blob_store().put(raw) if raw else None
+
+def update_user(db: Session, user_id: str, user_update: schemas.UserUpdate, profile_image_ref: str = None):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         return None
@@ -31,56 +74,224 @@ def update_user(db: Session, user_id: str, user_update: schemas.UserUpdate):
     if user_update.subtitle is not None:
         db_user.subtitle = user_update.subtitle
     if user_update.profile_image_data is not None:
-        db_user.profile_image_data = user_update.profile_image_data
+        db_user.profile_image_ref = profile_image_ref or store_profile_image(user_update.profile_image_data)
         
     db.commit()
     db.refresh(db_user)
+    user_cache.invalidate(db_user.email)
+    return db_user
+
+def deactivate_user(db: Session, user_id: str):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user:
+        db_user.is_active = 0
+        db.commit()
+        user_cache.invalidate(db_user.email)
     return db_user
 
-def get_expense(db: Session, expense_id: str, user_id: str):
-    return db.query(models.Expense).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
+def get_expense(db: Session, expense_id: str, user_id: str, load_strategy: str = None):
+    return (
+        db.query(models.Expense)
+        .options(*expense_load_options(load_strategy))
+        .filter(models.Expense.id == expense_id, models.Expense.user_id == user_id)
+        .first()
+    )
+
+# Keyset order for each list: expenses newest (or largest) first, friends/saved
+# items by name. The id column breaks ties so the order is total and cursors
+# are stable.
+EXPENSE_SORTS = {
+    # sort -> (column, cursor value parser)
+    "date": (models.Expense.date, datetime.fromisoformat),
+    "amount": (models.Expense.amount, float),
+}
+
+def expense_sort_key(sort: str = "date"):
+    column = EXPENSE_SORTS[sort][0]
+    return lambda expense: (getattr(expense, column.key), expense.id)
+
+def name_page_key(row):
+    return (row.name, row.id)
+
+def filter_expenses(query, filters: schemas.ExpenseFilters = None):
+    if filters is None:
+        return query
+    if filters.start is not None:
+        query = query.filter(models.Expense.date >= filters.start)
+    if filters.end is not None:
+        query = query.filter(models.Expense.date < filters.end)
+    if filters.category is not None:
+        query = query.filter(models.Expense.category == filters.category.value)
+    if filters.min_amount is not None:
+        query = query.filter(models.Expense.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.filter(models.Expense.amount <= filters.max_amount)
+    if filters.participant is not None:
+        # EXISTS against splits (expense_id, name)
+        query = query.filter(models.Expense.splits.any(models.Split.name == filters.participant))
+    return query
+
+def expenses_query(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None, load_strategy: str = None, filters: schemas.ExpenseFilters = None, sort: str = "date"):
+    column, parse = EXPENSE_SORTS[sort]
+    query = (
+        db.query(models.Expense)
+        .options(*expense_load_options(load_strategy))
+        .filter(models.Expense.user_id == user_id)
+    )
+    query = filter_expenses(query, filters)
+    if cursor:
+        value, expense_id = decode_cursor(cursor, parse, str)
+        query = query.filter(tuple_(column, models.Expense.id) < tuple_(value, expense_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(column.desc(), models.Expense.id.desc()).limit(limit)
+
+def get_expenses(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None, load_strategy: str = None, filters: schemas.ExpenseFilters = None, sort: str = "date"):
+    return expenses_query(db, user_id, skip, limit, cursor, load_strategy, filters, sort).all()
+
+def _month_bound(value: datetime):
+    # "YYYY-MM" when the bound falls exactly on a month boundary
+    if value is None:
+        return None
+    if value.day == 1 and value.time() == datetime.min.time():
+        return rollups.month_key(value)
+    raise ValueError("Not a month boundary")
+
+def get_expense_summary(db: Session, user_id: str, group_by: str = "category", start: datetime = None, end: datetime = None):
+    # Totals per bucket: [(key, total, count)]. Category and month totals over
+    # whole months come from the rollups; anything finer is aggregated from
+    # the expenses themselves.
+    if group_by in ("category", "month"):
+        try:
+            start_month, end_month = _month_bound(start), _month_bound(end)
+        except ValueError:
+            pass
+        else:
+            return rollups.get_summary(db, user_id, group_by, start_month, end_month)
+
+    conditions = [models.Expense.user_id == user_id]
+    if start is not None:
+        conditions.append(models.Expense.date >= start)
+    if end is not None:
+        conditions.append(models.Expense.date < end)
+
+    if group_by == "participant":
+        # A split without an amount gets an equal share of its expense
+        split_counts = (
+            select(models.Split.expense_id, func.count().label("splits"))
+            .group_by(models.Split.expense_id)
+            .subquery()
+        )
+        key = models.Split.name
+        share = func.coalesce(models.Split.amount, models.Expense.amount / split_counts.c.splits)
+        query = (
+            db.query(key, func.sum(share), func.count(models.Split.id))
+            .select_from(models.Expense)
+            .join(models.Split, models.Split.expense_id == models.Expense.id)
+            .join(split_counts, split_counts.c.expense_id == models.Expense.id)
+        )
+    else:
+        if group_by == "category":
+            key = models.Expense.category
+        else:
+            key = rollups.period_expression(db.get_bind().dialect.name, models.Expense.date, group_by)
+        query = db.query(key, func.sum(models.Expense.amount), func.count(models.Expense.id))
+
+    rows = query.filter(*conditions).group_by(key).order_by(key).all()
+    return [(bucket, total or 0.0, count) for bucket, total, count in rows]
+
+# Blob lookups return the blob store key; the bytes are streamed by the caller
+def get_expense_receipt_ref(db: Session, expense_id: str, user_id: str):
+    row = db.query(models.Expense.receipt_ref).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
+    return row.receipt_ref if row else None
+
+def get_expense_item_image_ref(db: Session, expense_id: str, item_id: str, user_id: str):
+    row = (
+        db.query(models.ExpenseItem.image_ref)
+        .join(models.Expense, models.ExpenseItem.expense_id == models.Expense.id)
+        .filter(
+            models.ExpenseItem.id == item_id,
+            models.ExpenseItem.expense_id == expense_id,
+            models.Expense.user_id == user_id,
+        )
+        .first()
+    )
+    return row.image_ref if row else None
+
+def get_user_profile_image_ref(db: Session, user_id: str):
+    row = db.query(models.User.profile_image_ref).filter(models.User.id == user_id).first()
+    return row.profile_image_ref if row else None
+
+def notification_payload(db_expense: models.Expense):
+    return {
+        "title": db_expense.title,
+        "amount": f"{db_expense.amount:.2f}",
+        "date": db_expense.date.strftime("%Y-%m-%d %H:%M"),
+        "category": db_expense.category,
+        "id": db_expense.id
+    }
+
+def enqueue_notification(db: Session, user_id: str, channel: str, recipient: str, payload: dict, attachment_ref: str = None):
+    # Added to the caller's transaction; app.worker delivers it after commit
+    db_message = models.NotificationOutbox(
+        user_id=user_id,
+        channel=channel,
+        recipient=recipient,
+        payload=json.dumps(payload),
+        attachment_ref=attachment_ref
+    )
+    db.add(db_message)
+    return db_message
+
+def _enqueue_expense_notifications(db: Session, db_expense: models.Expense, expense: schemas.ExpenseCreate):
+    payload = notification_payload(db_expense)
+    if expense.recipient_email:
+        enqueue_notification(db, db_expense.user_id, "email", expense.recipient_email, payload, db_expense.receipt_ref)
+    if expense.telegram_chat_id:
+        enqueue_notification(db, db_expense.user_id, "telegram", expense.telegram_chat_id, payload, db_expense.receipt_ref)
 
-def get_expenses(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Expense).filter(models.Expense.user_id == user_id).offset(skip).limit(limit).all()
+def ingest_expense_images(expense: schemas.ExpenseCreate):
+    # (receipt ref, [item image refs]). This is the Pillow work and the blob
+    # writes; async callers run it in the threadpool and pass the refs in, so
+    # none of it happens under AsyncSession.run_sync on the event loop.
+    return ingest_image(expense.receipt_data), [ingest_image(item.image_data) for item in expense.items]
 
-def create_expense(db: Session, expense: schemas.ExpenseCreate, user_id: str):
+def create_expense(db: Session, expense: schemas.ExpenseCreate, user_id: str, image_refs=None):
+    receipt_ref, item_refs = image_refs or ingest_expense_images(expense)
     try:
+        # Ids are generated here rather than by a first commit, so the whole
+        # graph goes out in one flush and one commit
+        expense_id = str(uuid.uuid4())
         db_expense = models.Expense(
+            id=expense_id,
             user_id=user_id,
             title=expense.title,
             amount=expense.amount,
             date=expense.date,
             category=expense.category.value, # Store the string value
-            receipt_data=expense.receipt_data,
-            recipient_email=expense.recipient_email
+            receipt_ref=receipt_ref,
+            has_receipt=receipt_ref is not None,
+            recipient_email=expense.recipient_email,
+            paid_by=expense.paid_by,
+            splits=[
+                _new_split(expense_id, split)
+                for split in expense.splits
+            ],
+            items=[
+                _new_expense_item(expense_id, item, image_ref)
+                for item, image_ref in zip(expense.items, item_refs)
+            ]
         )
         db.add(db_expense)
+        rollups.apply(db, [rollups.expense_delta(db_expense)])
+        _enqueue_expense_notifications(db, db_expense, expense)
+
+        # Everything the response needs is already in memory: detach the graph
+        # before committing so the commit doesn't expire it and force a reload
+        db.flush()
+        db.expunge(db_expense)
         db.commit()
-        db.refresh(db_expense)
-        
-        # Create splits if any
-        for split in expense.splits:
-            db_split = models.Split(
-                expense_id=db_expense.id,
-                name=split.name,
-                initials=split.initials,
-                amount=split.amount
-            )
-            db.add(db_split)
-        
-        # Create items if any
-        for item in expense.items:
-            db_item = models.ExpenseItem(
-                expense_id=db_expense.id,
-                name=item.name,
-                price=item.price,
-                quantity=item.quantity,
-                image_data=item.image_data
-            )
-            db.add(db_item)
-        
-        db.commit()
-        db.refresh(db_expense)
+        suggest.items_used(user_id, [item.name for item in expense.items])
         return db_expense
     except Exception as e:
         db.rollback()
@@ -88,10 +299,101 @@ def create_expense(db: Session, expense: schemas.ExpenseCreate, user_id: str):
         # Raise it again so FastAPI can handle it (or return None)
         raise e
 
+def _new_split(expense_id: str, split: schemas.SplitCreate):
+    return models.Split(
+        id=str(uuid.uuid4()),
+        expense_id=expense_id,
+        name=split.name,
+        initials=split.initials,
+        amount=split.amount
+    )
+
+def _new_expense_item(expense_id: str, item: schemas.ExpenseItemCreate, image_ref: str):
+    return models.ExpenseItem(
+        id=str(uuid.uuid4()),
+        expense_id=expense_id,
+        name=item.name,
+        price=item.price,
+        quantity=item.quantity,
+        image_ref=image_ref,
+        has_image=image_ref is not None
+    )
+
+def _expense_rows(expense: schemas.ExpenseCreate, user_id: str, image_refs):
+    # Plain column dicts for bulk INSERTs; ids are generated here so children
+    # can reference their parent without a round trip
+    receipt_ref, item_refs = image_refs
+    expense_id = str(uuid.uuid4())
+    parent = {
+        "id": expense_id,
+        "user_id": user_id,
+        "title": expense.title,
+        "amount": expense.amount,
+        "date": expense.date,
+        "category": expense.category.value,
+        "receipt_ref": receipt_ref,
+        "recipient_email": expense.recipient_email,
+        "paid_by": expense.paid_by,
+    }
+    splits = [
+        {"id": str(uuid.uuid4()), "expense_id": expense_id, "name": split.name, "initials": split.initials, "amount": split.amount}
+        for split in expense.splits
+    ]
+    items = [
+        {"id": str(uuid.uuid4()), "expense_id": expense_id, "name": item.name, "price": item.price, "quantity": item.quantity, "image_ref": image_ref}
+        for item, image_ref in zip(expense.items, item_refs)
+    ]
+    return parent, splits, items
+
+def _insert_expense_rows(db: Session, batch):
+    parents = [parent for parent, _, _ in batch]
+    splits = [split for _, rows, _ in batch for split in rows]
+    items = [item for _, _, rows in batch for item in rows]
+    db.execute(insert(models.Expense), parents)
+    rollups.apply(db, [rollups.expense_delta(SimpleNamespace(**parent)) for parent in parents])
+    if splits:
+        db.execute(insert(models.Split), splits)
+    if items:
+        db.execute(insert(models.ExpenseItem), items)
+
+def create_expenses_batch(db: Session, expenses, user_id: str, image_refs=None):
+    # One transaction for the whole batch, one INSERT per table. If the batch
+    # is rejected, fall back to a savepoint per expense so the valid ones still
+    # land and the caller learns which ones failed. image_refs is one
+    # ingest_expense_images result per expense, when already ingested.
+    image_refs = image_refs or [ingest_expense_images(expense) for expense in expenses]
+    batch = [_expense_rows(expense, user_id, refs) for expense, refs in zip(expenses, image_refs)]
+    try:
+        _insert_expense_rows(db, batch)
+        for (parent, _, _), expense in zip(batch, expenses):
+            _enqueue_expense_notifications(db, SimpleNamespace(**parent), expense)
+        db.commit()
+        suggest.items_used(user_id, [item["name"] for _, _, items in batch for item in items])
+        return [{"index": index, "status": "created", "id": parent["id"]} for index, (parent, _, _) in enumerate(batch)]
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Batch insert failed, retrying per expense: {e}")
+
+    results = []
+    for index, (rows, expense) in enumerate(zip(batch, expenses)):
+        try:
+            with db.begin_nested():
+                _insert_expense_rows(db, [rows])
+                _enqueue_expense_notifications(db, SimpleNamespace(**rows[0]), expense)
+            results.append({"index": index, "status": "created", "id": rows[0]["id"]})
+        except Exception as e:
+            results.append({"index": index, "status": "error", "error": str(e)})
+    db.commit()
+    created = [rows for rows, result in zip(batch, results) if result["status"] == "created"]
+    suggest.items_used(user_id, [item["name"] for _, _, items in created for item in items])
+    return results
+
 def delete_expense(db: Session, expense_id: str, user_id: str):
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
     if db_expense:
         db.delete(db_expense)
+        rollups.apply(db, [rollups.expense_delta(db_expense, -1)])
+        _add_tombstone(db, user_id, "expense", expense_id)
         db.commit()
     return db_expense
 
@@ -99,7 +401,8 @@ def update_expense(db: Session, expense_id: str, expense: schemas.ExpenseUpdate,
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
     if not db_expense:
         return None
-    
+    previous = rollups.expense_delta(db_expense, -1)
+
     # Update fields
     if expense.title is not None:
         db_expense.title = expense.title
@@ -109,46 +412,81 @@ def update_expense(db: Session, expense_id: str, expense: schemas.ExpenseUpdate,
         db_expense.date = expense.date
     if expense.category is not None:
         db_expense.category = expense.category.value
-    if expense.receipt_data is not None:
-        db_expense.receipt_data = expense.receipt_data
+    if _is_new_blob(db_expense.receipt_ref, expense.receipt_data):
+        db_expense.receipt_ref = ingest_image(expense.receipt_data)
     if expense.recipient_email is not None:
         db_expense.recipient_email = expense.recipient_email
-        
-    # Update Splits (Replace strategy)
+    if expense.paid_by is not None:
+        db_expense.paid_by = expense.paid_by or None  # "" resets to the owner
+    # Child edits don't UPDATE the expense row, so onupdate alone would miss them
+    db_expense.updated_at = datetime.utcnow()
+    rollups.apply(db, [previous, rollups.expense_delta(db_expense)])
+
     if expense.splits is not None:
-        # Delete existing splits
-        db.query(models.Split).filter(models.Split.expense_id == expense_id).delete()
-        # Add new splits
-        for split in expense.splits:
-            db_split = models.Split(
-                expense_id=db_expense.id,
-                name=split.name,
-                initials=split.initials,
-                amount=split.amount
-            )
-            db.add(db_split)
-            
-    # Update Items (Replace strategy)
+        _sync_children(
+            db_expense.splits, expense.splits,
+            create=lambda split: _new_split(db_expense.id, split),
+            update=_update_split
+        )
     if expense.items is not None:
-        # Delete existing items
-        db.query(models.ExpenseItem).filter(models.ExpenseItem.expense_id == expense_id).delete()
-        # Add new items
-        for item in expense.items:
-            db_item = models.ExpenseItem(
-                expense_id=db_expense.id,
-                name=item.name,
-                price=item.price,
-                quantity=item.quantity,
-                image_data=item.image_data
-            )
-            db.add(db_item)
-            
+        _sync_children(
+            db_expense.items, expense.items,
+            create=lambda item: _new_expense_item(db_expense.id, item, ingest_image(item.image_data)),
+            update=_update_expense_item
+        )
+
     db.commit()
     db.refresh(db_expense)
     return db_expense
 
-def get_friends(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Friend).filter(models.Friend.user_id == user_id).offset(skip).limit(limit).all()
+def _is_new_blob(ref: str, data: bytes):
+    # Clients usually echo back the image they downloaded; only bytes that
+    # differ from what's stored need normalizing and writing again. The echo
+    # is base64 while the store holds raw bytes, so compare decoded
+    return data is not None and blob_key(decode_image_payload(data)[0]) != ref
+
+def _sync_children(collection, incoming, create, update):
+    # Applies the smallest diff to a child collection: entries carrying the id
+    # of an existing row update it in place, entries without one are inserted
+    # and rows left out are deleted (delete-orphan). A list without ids
+    # therefore still replaces everything, as before.
+    existing = {child.id: child for child in collection}
+    for entry in incoming:
+        child = existing.pop(entry.id, None) if entry.id else None
+        if child is None:
+            collection.append(create(entry))
+        else:
+            update(child, entry)
+    for child in existing.values():
+        collection.remove(child)
+
+def _update_split(db_split: models.Split, split: schemas.SplitUpdate):
+    db_split.name = split.name
+    db_split.initials = split.initials
+    db_split.amount = split.amount
+
+def _update_expense_item(db_item: models.ExpenseItem, item: schemas.ExpenseItemUpdate):
+    # Unchanged columns are left out of the UPDATE, so an item whose photo is
+    # omitted (or echoed back unchanged) never touches image_ref
+    db_item.name = item.name
+    db_item.price = item.price
+    db_item.quantity = item.quantity
+    if item.clear_image:
+        db_item.image_ref = None
+    elif _is_new_blob(db_item.image_ref, item.image_data):
+        db_item.image_ref = ingest_image(item.image_data)
+
+def _name_page(query, model, skip: int, limit: int, cursor: str):
+    if cursor:
+        name, row_id = decode_cursor(cursor, str, str)
+        query = query.filter(tuple_(model.name, model.id) > tuple_(name, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(model.name, model.id).limit(limit).all()
+
+def get_friends(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = db.query(models.Friend).filter(models.Friend.user_id == user_id)
+    return _name_page(query, models.Friend, skip, limit, cursor)
 
 def create_friend(db: Session, friend: schemas.FriendCreate, user_id: str):
     db_friend = models.Friend(
@@ -163,14 +501,16 @@ def create_friend(db: Session, friend: schemas.FriendCreate, user_id: str):
     db.refresh(db_friend)
     return db_friend
 
-def get_saved_items(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(models.SavedItem).filter(models.SavedItem.user_id == user_id).offset(skip).limit(limit).all()
+def get_saved_items(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = db.query(models.SavedItem).filter(models.SavedItem.user_id == user_id)
+    return _name_page(query, models.SavedItem, skip, limit, cursor)
 
 def create_saved_item(db: Session, item: schemas.SavedItemCreate, user_id: str):
     db_item = models.SavedItem(user_id=user_id, name=item.name, default_price=item.default_price)
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    suggest.saved_item_changed(user_id, db_item.id, db_item.name, db_item.default_price)
     return db_item
 
 def update_saved_item(db: Session, item_id: str, item: schemas.SavedItemCreate, user_id: str):
@@ -180,11 +520,56 @@ def update_saved_item(db: Session, item_id: str, item: schemas.SavedItemCreate,
         db_item.default_price = item.default_price
         db.commit()
         db.refresh(db_item)
+        suggest.saved_item_changed(user_id, db_item.id, db_item.name, db_item.default_price)
     return db_item
 
 def delete_saved_item(db: Session, item_id: str, user_id: str):
     db_item = db.query(models.SavedItem).filter(models.SavedItem.id == item_id, models.SavedItem.user_id == user_id).first()
     if db_item:
         db.delete(db_item)
+        _add_tombstone(db, user_id, "saved_item", item_id)
         db.commit()
+        suggest.saved_item_deleted(user_id, item_id)
     return db_item
+
+def _add_tombstone(db: Session, user_id: str, resource: str, resource_id: str):
+    db.add(models.Tombstone(user_id=user_id, resource=resource, resource_id=resource_id))
+
+# Rows are stamped in Python before their transaction commits, so a slow
+# writer can commit a change dated slightly before a sync that has already
+# run. Each sync looks back this far past its token to pick those up; clients
+# apply changes as upserts, so the overlap is harmless.
+SYNC_LOOKBACK_SECONDS = float(os.getenv("SYNC_LOOKBACK_SECONDS", "5"))
+
+def get_changes(db: Session, user_id: str, since: datetime = None):
+    # Everything changed or deleted since `since` (all live rows when None),
+    # plus the timestamp to pass as the next `since`
+    synced_at = datetime.utcnow()
+    expenses = db.query(models.Expense).options(*expense_load_options()).filter(models.Expense.user_id == user_id)
+    friends = db.query(models.Friend).filter(models.Friend.user_id == user_id)
+    saved_items = db.query(models.SavedItem).filter(models.SavedItem.user_id == user_id)
+    deleted = {"expense": [], "friend": [], "saved_item": []}
+
+    if since is not None:
+        since = since - timedelta(seconds=SYNC_LOOKBACK_SECONDS)
+        expenses = expenses.filter(models.Expense.updated_at >= since)
+        friends = friends.filter(models.Friend.updated_at >= since)
+        saved_items = saved_items.filter(models.SavedItem.updated_at >= since)
+        tombstones = db.query(models.Tombstone.resource, models.Tombstone.resource_id).filter(
+            models.Tombstone.user_id == user_id,
+            models.Tombstone.deleted_at >= since
+        )
+        for resource, resource_id in tombstones:
+            deleted.setdefault(resource, []).append(resource_id)
+
+    return {
+        "expenses": expenses.all(),
+        "friends": friends.all(),
+        "saved_items": saved_items.all(),
+        "deleted": {
+            "expenses": deleted["expense"],
+            "friends": deleted["friend"],
+            "saved_items": deleted["saved_item"]
+        },
+        "synced_at": synced_at
+    }
@@ -0,0 +1,88 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from . import crud, schemas
+from .blobstore import get_blob_store
+
+# Awaitable versions of the crud functions used by the async handlers in
+# main.py. With an AsyncSession (DB_ASYNC=true) the sync ORM code in crud runs
+# on the asyncio engine through run_sync; with a plain Session it is pushed to
+# the threadpool. Either way the event loop never waits on the database.
+#
+# Image uploads are normalized and written to the blob store in the
+# threadpool before the session is entered, and crud gets the blob refs:
+# run_sync executes on the event loop thread, so Pillow work there would block it.
+#
+# Results that carry relationships are converted to schemas while still inside
+# the session: an async session can't lazy-load once we're back on the loop.
+# Image fields are the exception: inside the session we only take their blob
+# refs, and the blobs are read into the response schema in the threadpool.
+
+async def _call(db, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def _as_schema(fn, schema):
+    def wrapper(session, *args, **kwargs):
+        result = fn(session, *args, **kwargs)
+        return schema.model_validate(result) if result is not None else None
+    return wrapper
+
+def _snapshot(fn, schema, refs):
+    # (schema without image fields, blob refs); nothing here touches the store
+    def wrapper(session, *args, **kwargs):
+        result = fn(session, *args, **kwargs)
+        return (schema.model_validate(result), refs(result)) if result is not None else None
+    return wrapper
+
+async def _with_blobs(snapshot, build):
+    return await run_in_threadpool(build, *snapshot) if snapshot is not None else None
+
+def _expense_refs(db_expense):
+    return db_expense.receipt_ref, {item.id: item.image_ref for item in db_expense.items}
+
+def _expense_with_blobs(listed: schemas.ExpenseListItem, refs):
+    receipt_ref, item_refs = refs
+    store = get_blob_store()
+    data = listed.model_dump()
+    data["receipt_data"] = store.get(receipt_ref)
+    data["items"] = [{**item, "image_data": store.get(item_refs[item["id"]])} for item in data["items"]]
+    return schemas.Expense.model_validate(data)
+
+def _user_with_blobs(user: schemas.AuthenticatedUser, profile_image_ref):
+    return schemas.User(**user.model_dump(), profile_image_data=get_blob_store().get(profile_image_ref))
+
+async def get_user_by_email(db, email: str):
+    return await _call(db, crud.get_user_by_email, email=email)
+
+async def get_auth_user_by_email(db, email: str):
+    return await _call(db, _as_schema(crud.get_auth_user_by_email, schemas.AuthenticatedUser), email=email)
+
+async def create_user(db, user: schemas.UserCreate, hashed_password: str):
+    snapshot = await _call(
+        db, _snapshot(crud.create_user, schemas.AuthenticatedUser, lambda db_user: db_user.profile_image_ref),
+        user=user, hashed_password=hashed_password
+    )
+    return await _with_blobs(snapshot, _user_with_blobs)
+
+async def update_user(db, user_id: str, user_update: schemas.UserUpdate):
+    profile_image_ref = None
+    if user_update.profile_image_data is not None:
+        profile_image_ref = await run_in_threadpool(crud.store_profile_image, user_update.profile_image_data)
+    snapshot = await _call(
+        db, _snapshot(crud.update_user, schemas.AuthenticatedUser, lambda db_user: db_user.profile_image_ref),
+        user_id=user_id, user_update=user_update, profile_image_ref=profile_image_ref
+    )
+    return await _with_blobs(snapshot, _user_with_blobs)
+
+async def create_expense(db, expense: schemas.ExpenseCreate, user_id: str):
+    image_refs = await run_in_threadpool(crud.ingest_expense_images, expense)
+    snapshot = await _call(
+        db, _snapshot(crud.create_expense, schemas.ExpenseListItem, _expense_refs),
+        expense=expense, user_id=user_id, image_refs=image_refs
+    )
+    return await _with_blobs(snapshot, _expense_with_blobs)
+
+async def create_expenses_batch(db, expenses, user_id: str):
+    image_refs = await run_in_threadpool(lambda: [crud.ingest_expense_images(expense) for expense in expenses])
+    return await _call(db, crud.create_expenses_batch, expenses=expenses, user_id=user_id, image_refs=image_refs)
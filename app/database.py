@@ -1,7 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,6 +18,13 @@ Base = declarative_base()
 # Global variables
 engine = None
 SessionLocal = None
+async_engine = None
+AsyncSessionLocal = None
+
+# When enabled, the async handlers use an asyncio-native engine (asyncpg for
+# Postgres, aiosqlite for SQLite). Otherwise they run the sync session in the
+# threadpool. The sync engine is always created for the sync handlers.
+USE_ASYNC_DB = os.environ.get("DB_ASYNC", "false").lower() == "true"
 
 def get_database_url():
     # Default to SQLite for local development (Old Version Configuration)
@@ -30,20 +42,108 @@ def get_database_url():
         
     return url
 
-def init_db():
-    global engine, SessionLocal
-    
+def get_pool_settings():
+    # Connection pool sizing, per process. With gunicorn each worker has its own
+    # pool, so Postgres sees up to workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    # Pre-ping costs a round trip on every checkout but hides dropped connections.
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 300)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+def get_engine_pool_args(url, poolclass):
+    settings = get_pool_settings()
+    if ":memory:" in url:
+        # In-memory SQLite keeps a single connection per thread; sizing doesn't apply
+        return {"pool_pre_ping": settings["pool_pre_ping"]}
+    return {"poolclass": poolclass, **settings}
+
+class _WaitTimingMixin:
+    # Records how long checkouts wait on the pool (including timeouts) so we can
+    # tell when DB_POOL_SIZE / DB_MAX_OVERFLOW are too small for the traffic
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": self.overflow(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _pool_stats(pool):
+    if hasattr(pool, "stats"):
+        return pool.stats()
+    return {"status": pool.status()}
+
+def get_pool_stats():
+    stats = {"settings": get_pool_settings(), "sync": None, "async": None}
+    if engine is not None:
+        stats["sync"] = _pool_stats(engine.pool)
+    if async_engine is not None:
+        stats["async"] = _pool_stats(async_engine.sync_engine.pool)
+    return stats
+
+def get_async_database_url():
     url = get_database_url()
-    # Mask password for logs
-    safe_url = url
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    return url
+
+def mask_url(url):
     if "@" in url:
         try:
             # simple masking
             part1 = url.split("@")[0]
             part2 = url.split("@")[1]
-            safe_url = f"{part1.split(':')[0]}:***@{part2}"
+            return f"{part1.split(':')[0]}:***@{part2}"
         except:
             pass
+    return url
+
+def init_db():
+    global engine, SessionLocal
+    
+    url = get_database_url()
+    # Mask password for logs
+    safe_url = mask_url(url)
             
     print(f"✅ Initializing Database with URL: {safe_url}")
     
@@ -58,8 +158,7 @@ def init_db():
         engine = create_engine(
             url, 
             connect_args=connect_args,
-            pool_pre_ping=True, 
-            pool_recycle=300,
+            **get_engine_pool_args(url, InstrumentedQueuePool),
         )
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db_init_error = None
@@ -69,5 +168,33 @@ def init_db():
         print(f"❌ Failed to create engine: {e}")
         return False
 
+def init_async_db():
+    global async_engine, AsyncSessionLocal
+
+    url = get_async_database_url()
+    print(f"✅ Initializing async Database with URL: {mask_url(url)}")
+
+    is_sqlite = "sqlite" in url
+
+    connect_args = {} if is_sqlite else {
+        "timeout": 10,
+        "server_settings": {"application_name": "we-expense-api"}
+    }
+
+    try:
+        async_engine = create_async_engine(
+            url,
+            connect_args=connect_args,
+            **get_engine_pool_args(url, InstrumentedAsyncQueuePool),
+        )
+        # Objects are serialized after the session closes, so don't expire them on commit
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        return True
+    except Exception as e:
+        print(f"❌ Failed to create async engine: {e}")
+        return False
+
 # Initialize immediately (but inside try-catch block in main.py)
 init_db()
+if USE_ASYNC_DB:
+    init_async_db()
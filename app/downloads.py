@@ -0,0 +1,82 @@
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from .blobstore import get_blob_store
+from .media import detect_media_type
+
+# Raw blob downloads with conditional and partial requests. Blob keys are
+# SHA-256 content hashes, so they make a strong ETag for free: a changed
+# receipt gets a new key and therefore a new ETag.
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header: str, size: int):
+    # Returns (start, end) inclusive for a single byte range, or None when the
+    # header should be ignored (bad syntax, other units, multiple ranges) and
+    # the full body served instead. Raises RangeNotSatisfiable for ranges that
+    # lie entirely past the end of the blob.
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+def etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def blob_response(request: Request, ref: str, not_found: str):
+    store = get_blob_store()
+    if not ref or not store.exists(ref):
+        raise HTTPException(status_code=404, detail=not_found)
+
+    etag = f'"{ref}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Private data: let the client cache it but always revalidate
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = store.size(ref)
+    with store.open(ref) as f:
+        media_type = detect_media_type(f.read(32))
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(store.iter_chunks(ref, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(store.iter_chunks(ref), media_type=media_type, headers=headers)
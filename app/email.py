@@ -1,8 +1,17 @@
+import asyncio
+import mimetypes
 import os
+import time
+import weakref
+from io import BytesIO
 from pathlib import Path
+import aiosmtplib
+from fastapi import UploadFile
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from starlette.datastructures import Headers
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+from .media import detect_media_type
 
 load_dotenv()
 
@@ -16,6 +25,9 @@ class EmailSettings(BaseSettings):
     MAIL_SSL_TLS: bool = os.getenv("MAIL_SSL_TLS", "True").lower() == "true"
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 2))
+    # Most servers drop idle sessions after a minute or so; retire ours before that
+    SMTP_IDLE_SECONDS: float = float(os.getenv("SMTP_IDLE_SECONDS", 45))
 
 settings = EmailSettings()
 
@@ -32,23 +44,110 @@ conf = ConnectionConfig(
     TEMPLATE_FOLDER=Path(__file__).parent / "templates"
 )
 
+# FastMail is only used to render templates and build the MIME message; the
+# SMTP transport is our own pool so consecutive messages reuse an already
+# authenticated connection instead of paying TCP + TLS + AUTH every time.
+fm = FastMail(conf)
+
+# Connection-level failures: the message didn't go out and the socket is gone
+_CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError)
+
+class SMTPConnectionPool:
+    def __init__(self, config: ConnectionConfig, size: int = settings.SMTP_POOL_SIZE, idle_seconds: float = settings.SMTP_IDLE_SECONDS):
+        self.config = config
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._idle = []  # (smtp, last_used) stack, most recently used last
+        self._slots = asyncio.Semaphore(size)
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            timeout=self.config.TIMEOUT,
+        )
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        self.connections_opened += 1
+        return smtp
+
+    async def _discard(self, smtp):
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _checkout(self):
+        now = time.monotonic()
+        while self._idle:
+            smtp, last_used = self._idle.pop()
+            if smtp.is_connected and now - last_used < self.idle_seconds:
+                return smtp
+            await self._discard(smtp)
+        return await self._connect()
+
+    async def _send_on(self, smtp, message):
+        await smtp.send_message(message)
+        self.messages_sent += 1
+
+    async def send(self, message):
+        # Sends over a pooled connection, reconnecting once if the server
+        # dropped it while it sat idle
+        async with self._slots:
+            smtp = await self._checkout()
+            try:
+                try:
+                    await self._send_on(smtp, message)
+                except _CONNECTION_ERRORS:
+                    await self._discard(smtp)
+                    smtp = await self._connect()
+                    await self._send_on(smtp, message)
+            except Exception:
+                await self._discard(smtp)
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    async def close(self):
+        while self._idle:
+            smtp, _ = self._idle.pop()
+            await self._discard(smtp)
+
+# asyncio connections belong to the loop that opened them, so keep one pool per loop
+_pools = weakref.WeakKeyDictionary()
+
+def get_mail_pool() -> SMTPConnectionPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = SMTPConnectionPool(conf)
+    return pool
+
+async def close_mail_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+def receipt_attachment(receipt_data: bytes) -> UploadFile:
+    # Built in memory: no temp file to write, read back or leak on failure
+    media_type = detect_media_type(receipt_data)
+    extension = mimetypes.guess_extension(media_type) or ".bin"
+    return UploadFile(
+        file=BytesIO(receipt_data),
+        filename=f"receipt{extension}",
+        headers=Headers({"content-type": media_type}),
+    )
+
 async def send_receipt_email(email_to: str, expense_data: dict, receipt_data: bytes = None):
-    attachments = []
-    
-    if receipt_data:
-        # Create a temporary file for the attachment
-        # FastAPI-Mail typically expects file paths or UploadFile objects,
-        # but we can try passing the bytes directly if supported, or save to temp.
-        # Let's verify the library version capabilities.
-        # Actually, MessageSchema accepts 'attachments' as a list of file paths or UploadFiles.
-        # For raw bytes, it's safer to save to a temp file first.
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            tmp.write(receipt_data)
-            tmp.flush()
-            attachments.append(tmp.name)
-            
+    # Raises on failure, a bad attachment included, so the outbox worker can
+    # record why the message didn't go out
+    attachments = [receipt_attachment(receipt_data)] if receipt_data else []
     message = MessageSchema(
         subject=f"Receipt for {expense_data['title']}",
         recipients=[email_to],
@@ -56,19 +155,5 @@ async def send_receipt_email(email_to: str, expense_data: dict, receipt_data: by
         subtype=MessageType.html,
         attachments=attachments
     )
-
-    fm = FastMail(conf)
-    try:
-        await fm.send_message(message, template_name="receipt.html")
-        
-        # Clean up temp files
-        for file_path in attachments:
-            try:
-                os.remove(file_path)
-            except:
-                pass
-                
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    mime_message = await fm.get_message(message, template_name="receipt.html")
+    await get_mail_pool().send(mime_message)
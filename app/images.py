@@ -0,0 +1,104 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .blobstore import blob_key, get_blob_store
+from .media import decode_image_payload
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Pillow is optional: without it images are stored as uploaded and no
+    # thumbnails are produced
+    Image = None
+
+# Ingest stage for receipt and item photos. Phone cameras produce multi-MB
+# images; we bound their resolution before they reach the blob store and make
+# small thumbnails for list views in the background.
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 2048))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", 256))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+
+EXIF_ORIENTATION = 0x0112
+
+thumbnail_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+
+def _open(raw: bytes):
+    if Image is None:
+        return None
+    try:
+        image = Image.open(io.BytesIO(raw))
+        image.load()
+        return image
+    except Exception:
+        # Not an image Pillow understands (PDF, HEIC without a plugin, ...)
+        return None
+
+def _encode(image) -> bytes:
+    out = io.BytesIO()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        image.save(out, format="PNG", optimize=True)
+    else:
+        image.convert("RGB").save(out, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+def normalize_image(data: bytes) -> bytes:
+    # Always returns the raw image: base64 from the apps is decoded here, so
+    # the blob store holds real image bytes that can be served as they are
+    raw, _ = decode_image_payload(data)
+    image = _open(raw)
+    if image is None:
+        return raw
+
+    rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    too_large = max(image.size) > IMAGE_MAX_DIMENSION
+    if not too_large and not rotated and image.format in ("JPEG", "PNG"):
+        # Already a reasonable size and format; re-encoding would only lose quality
+        return raw
+
+    oriented = ImageOps.exif_transpose(image)
+    if too_large:
+        oriented.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+    return _encode(oriented)
+
+def make_thumbnail(data: bytes):
+    raw, _ = decode_image_payload(data)
+    image = _open(raw)
+    if image is None:
+        return None
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+    return _encode(image)
+
+def thumbnail_ref(source_ref: str) -> str:
+    # Derived from the source key, so finding a thumbnail needs no extra column
+    return blob_key(f"thumbnail:{THUMBNAIL_SIZE}:{source_ref}".encode())
+
+def ensure_thumbnail(source_ref: str):
+    store = get_blob_store()
+    ref = thumbnail_ref(source_ref)
+    if store.exists(ref):
+        return ref
+    data = store.get(source_ref)
+    thumbnail = make_thumbnail(data) if data else None
+    if thumbnail is None:
+        return None
+    store.put(thumbnail, key=ref)
+    return ref
+
+def _ensure_thumbnail_logged(source_ref: str):
+    try:
+        ensure_thumbnail(source_ref)
+    except Exception as e:
+        print(f"⚠️ Thumbnail generation failed for {source_ref}: {e}")
+
+def ingest_image(data: bytes):
+    # Normalizes and stores an uploaded image, returning its blob key
+    if not data:
+        return None
+    ref = get_blob_store().put(normalize_image(data))
+    thumbnail_pool.submit(_ensure_thumbnail_logged, ref)
+    return ref
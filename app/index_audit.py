@@ -0,0 +1,115 @@
+import argparse
+import sys
+
+from sqlalchemy import inspect
+
+from . import models, database
+
+# Flags foreign keys and filtered column combinations that no B-tree index
+# can serve. An access path counts as indexed when some index (or the primary
+# key) starts with its columns, in order: (user_id, date, id) covers both
+# user_id and (user_id, date).
+#
+#     python -m app.index_audit              # model metadata
+#     python -m app.index_audit --database   # the live database's indexes
+#
+# Exits non-zero when anything is missing, so it can run in CI.
+
+# Column combinations the queries in crud, rollups and the worker filter or sort on.
+# Foreign keys are checked automatically and don't need listing here.
+ACCESS_PATHS = [
+    ("users", ("email",)),
+    ("expenses", ("user_id", "date")),
+    ("expenses", ("user_id", "category", "date")),
+    ("expenses", ("user_id", "amount")),
+    ("expenses", ("user_id", "updated_at")),
+    ("splits", ("expense_id", "name")),
+    ("friends", ("user_id", "name")),
+    ("friends", ("user_id", "updated_at")),
+    ("saved_items", ("user_id", "name")),
+    ("saved_items", ("user_id", "updated_at")),
+    ("expense_rollups", ("user_id", "month")),
+    ("tombstones", ("user_id", "deleted_at")),
+    ("notification_outbox", ("status", "next_attempt_at")),
+]
+
+# Reason given when a table the models define isn't in the database at all
+MISSING_TABLE = "missing table"
+
+def metadata_indexes(metadata):
+    # table -> [column tuple], from the models. Dialect-specific indexes
+    # (the Postgres-only GIN search indexes) and expression indexes can't
+    # serve a B-tree prefix lookup, so they don't count.
+    indexes = {}
+    for table in metadata.tables.values():
+        keys = indexes.setdefault(table.name, [])
+        if table.primary_key.columns:
+            keys.append(tuple(c.name for c in table.primary_key.columns))
+        for index in table.indexes:
+            if getattr(index, "_ddl_if", None) is not None:
+                continue
+            columns = [getattr(expression, "name", None) for expression in index.expressions]
+            if None not in columns:
+                keys.append(tuple(columns))
+    return indexes
+
+def database_indexes(bind):
+    # table -> [column tuple], as the database (engine or connection) has them
+    inspector = inspect(bind)
+    indexes = {}
+    for table in inspector.get_table_names():
+        keys = indexes.setdefault(table, [])
+        primary_key = inspector.get_pk_constraint(table).get("constrained_columns")
+        if primary_key:
+            keys.append(tuple(primary_key))
+        for index in inspector.get_indexes(table):
+            columns = index.get("column_names") or []
+            if columns and None not in columns:
+                keys.append(tuple(columns))
+    return indexes
+
+def foreign_key_paths(metadata):
+    for table in metadata.tables.values():
+        for constraint in table.foreign_key_constraints:
+            yield table.name, tuple(column.name for column in constraint.columns), "foreign key"
+
+def audit(metadata, indexes, access_paths=ACCESS_PATHS):
+    # [(table, columns, reason)] for every path without a covering index, and
+    # (table, (), MISSING_TABLE) once for each table that doesn't exist
+    paths = list(foreign_key_paths(metadata))
+    paths += [(table, columns, "filter") for table, columns in access_paths]
+    missing = [(table.name, (), MISSING_TABLE) for table in metadata.tables.values() if table.name not in indexes]
+    for table, columns, reason in paths:
+        if table not in indexes:
+            if (table, (), MISSING_TABLE) not in missing:
+                missing.append((table, (), MISSING_TABLE))
+            continue
+        if not any(key[:len(columns)] == columns for key in indexes[table]):
+            missing.append((table, columns, reason))
+    return missing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.index_audit")
+    parser.add_argument("--database", action="store_true", help="Audit the configured database instead of the models")
+    args = parser.parse_args(argv)
+
+    if args.database:
+        if database.engine is None:
+            print("❌ Database not initialized")
+            return 2
+        indexes = database_indexes(database.engine)
+    else:
+        indexes = metadata_indexes(models.Base.metadata)
+
+    missing = audit(models.Base.metadata, indexes)
+    for table, columns, reason in missing:
+        if reason == MISSING_TABLE:
+            print(f"❌ {table}: table does not exist")
+        else:
+            print(f"❌ {table}({', '.join(columns)}): no index for {reason}")
+    if not missing:
+        print("✅ Every foreign key and filter column is indexed")
+    return 1 if missing else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,19 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, status
+import os
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from jose import JWTError, jwt
 
-from . import models, schemas, crud, auth
+from . import models, schemas, crud, crud_async, auth, database, search, suggest, balances
+from .blobstore import get_blob_store
+from .downloads import blob_response
+from .images import ensure_thumbnail
+from .cache import user_cache
+from .pagination import InvalidCursor, next_cursor, encode_cursor, decode_cursor
 from .database import SessionLocal, engine
-from .email import send_receipt_email
 from .database import SessionLocal, engine, init_db as initialize_database
 
 # Create tables
@@ -19,10 +25,28 @@ except Exception as e:
     # Don't crash here, let the app start. The endpoint requests might fail later if tables don't exist,
     # but at least we'll get logs instead of a hard crash.
 
+# Fail at startup rather than on the first upload when the blob store isn't
+# writable (e.g. a read-only serverless filesystem without a volume)
+get_blob_store()
+
 app = FastAPI()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# List endpoints return a plain JSON array; the cursor for the following page
+# travels in this header so existing clients keep working unchanged.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def paginate(response: Response, fetch, limit: int, key):
+    try:
+        rows = fetch()
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    cursor = next_cursor(rows, limit, key)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return rows
+
 # Dependency
 def get_db():
     if SessionLocal is None:
@@ -47,7 +71,20 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_session():
+    if database.AsyncSessionLocal is None and not database.init_async_db():
+        raise HTTPException(
+            status_code=500,
+            detail="Async database not initialized."
+        )
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for the async handlers: an AsyncSession when DB_ASYNC is enabled,
+# otherwise the regular Session (which crud_async runs in the threadpool)
+get_async_db = get_async_session if database.USE_ASYNC_DB else get_db
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -61,22 +98,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = user_cache.get(token_data.email)
     if user is None:
+        user = await crud_async.get_auth_user_by_email(db, email=token_data.email)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(token_data.email, user)
+    if not user.is_active:
         raise credentials_exception
     return user
 
 @app.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db = Depends(get_async_db)):
+    db_user = await crud_async.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    # Hashed on auth.hash_pool while the event loop waits on the future
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await crud_async.create_user(db, user=user, hashed_password=hashed_password)
 
 @app.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_async_db)):
+    user = await crud_async.get_user_by_email(db, email=form_data.username)
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -87,7 +131,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @app.post("/refresh", response_model=schemas.Token)
-async def refresh_token(token: str, db: Session = Depends(get_db)):
+async def refresh_token(token: str, db = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -101,7 +145,7 @@ async def refresh_token(token: str, db: Session = Depends(get_db)):
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=email)
+    user = await crud_async.get_auth_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
         
@@ -110,12 +154,21 @@ async def refresh_token(token: str, db: Session = Depends(get_db)):
     return {"access_token": access_token, "refresh_token": token, "token_type": "bearer"}
 
 @app.get("/users/me", response_model=schemas.User)
-async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
-    return current_user
+def read_users_me(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # The cached auth record has no profile image, so load the full row here
+    db_user = crud.get_user(db, user_id=current_user.id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
+@app.get("/users/me/profile-image")
+def read_profile_image(request: Request, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    image_ref = crud.get_user_profile_image_ref(db, user_id=current_user.id)
+    return blob_response(request, image_ref, "Profile image not found")
 
 @app.put("/users/me", response_model=schemas.User)
-async def update_user_me(user_update: schemas.UserUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    updated_user = crud.update_user(db, user_id=current_user.id, user_update=user_update)
+async def update_user_me(user_update: schemas.UserUpdate, db = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    updated_user = await crud_async.update_user(db, user_id=current_user.id, user_update=user_update)
     return updated_user
 
 @app.get("/db-test")
@@ -173,6 +226,22 @@ def test_db_connection():
         
     return status_info
 
+# Process-internal stats (connection pools, caches) are only served when
+# DIAGNOSTICS_ENABLED is set, and then only to signed-in users
+DIAGNOSTICS_ENABLED = os.environ.get("DIAGNOSTICS_ENABLED", "false").lower() == "true"
+
+def require_diagnostics(current_user: schemas.User = Depends(get_current_user)):
+    if not DIAGNOSTICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/db-pool", dependencies=[Depends(require_diagnostics)])
+def read_db_pool_stats():
+    return database.get_pool_stats()
+
+@app.get("/cache-stats", dependencies=[Depends(require_diagnostics)])
+def read_cache_stats():
+    return {"user_cache": user_cache.stats(), "suggest_indexes": suggest.suggest_indexes.stats()}
+
 @app.get("/")
 def read_root():
     return {"message": "Expense API is running"}
@@ -180,54 +249,90 @@ def read_root():
 @app.post("/expenses/", response_model=schemas.Expense)
 async def create_expense(
     expense: schemas.ExpenseCreate, 
-    background_tasks: BackgroundTasks,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     try:
-        db_expense = crud.create_expense(db=db, expense=expense, user_id=current_user.id)
-        
-        # Send email if recipient is provided
-        if expense.recipient_email:
-            expense_data = {
-                "title": db_expense.title,
-                "amount": f"{db_expense.amount:.2f}",
-                "date": db_expense.date.strftime("%Y-%m-%d %H:%M"),
-                "category": db_expense.category,
-                "id": db_expense.id
-            }
-            # Note: We need to update send_receipt_email to handle background tasks properly if it's async
-            # For now, let's assume it works or fix it later.
-            # background_tasks.add_task(send_receipt_email, expense.recipient_email, expense_data, expense.receipt_data)
-            
-        # Send Telegram notification (if configured)
-        if expense.telegram_chat_id:
-            expense_data = {
-                "title": db_expense.title,
-                "amount": f"{db_expense.amount:.2f}",
-                "date": db_expense.date.strftime("%Y-%m-%d %H:%M"),
-                "category": db_expense.category,
-                "id": db_expense.id
-            }
-            # background_tasks.add_task(send_telegram_notification, expense.telegram_chat_id, expense_data, expense.receipt_data)
-            
+        # Email / Telegram notifications are queued in the outbox by crud and
+        # delivered by the worker process (python -m app.worker)
+        db_expense = await crud_async.create_expense(db, expense=expense, user_id=current_user.id)
         return db_expense
     except Exception as e:
         print(f"Server Error creating expense: {e}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-@app.get("/expenses/", response_model=List[schemas.Expense])
-def read_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    expenses = crud.get_expenses(db, user_id=current_user.id, skip=skip, limit=limit)
-    return expenses
+@app.post("/expenses/batch", response_model=List[schemas.ExpenseBatchResult])
+async def create_expenses_batch(
+    batch: schemas.ExpenseBatchCreate,
+    current_user: schemas.User = Depends(get_current_user),
+    db = Depends(get_async_db)
+):
+    try:
+        return await crud_async.create_expenses_batch(db, expenses=batch.expenses, user_id=current_user.id)
+    except Exception as e:
+        print(f"Server Error creating expense batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@app.get("/expenses/", response_model=List[schemas.ExpenseListItem])
+def read_expenses(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: schemas.ExpenseSort = schemas.ExpenseSort.date,
+    filters: schemas.ExpenseFilters = Depends(),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    return paginate(
+        response,
+        lambda: crud.get_expenses(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor, load_strategy="selectin", filters=filters, sort=sort.value),
+        limit,
+        crud.expense_sort_key(sort.value),
+    )
+
+# Declared before /expenses/{expense_id} so "summary" isn't taken for an id
+@app.get("/expenses/summary", response_model=List[schemas.SummaryBucket])
+def read_expense_summary(
+    group_by: schemas.SummaryGrouping = schemas.SummaryGrouping.category,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    rows = crud.get_expense_summary(db, user_id=current_user.id, group_by=group_by.value, start=start, end=end)
+    return [{"key": key, "total": total, "count": count} for key, total, count in rows]
 
 @app.get("/expenses/{expense_id}", response_model=schemas.Expense)
 def read_expense(expense_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    db_expense = crud.get_expense(db, expense_id=expense_id, user_id=current_user.id)
+    db_expense = crud.get_expense(db, expense_id=expense_id, user_id=current_user.id, load_strategy="selectin")
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     return db_expense
 
+@app.get("/expenses/{expense_id}/receipt")
+def read_expense_receipt(request: Request, expense_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    receipt_ref = crud.get_expense_receipt_ref(db, expense_id=expense_id, user_id=current_user.id)
+    return blob_response(request, receipt_ref, "Receipt not found")
+
+@app.get("/expenses/{expense_id}/receipt/thumbnail")
+def read_expense_receipt_thumbnail(request: Request, expense_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    receipt_ref = crud.get_expense_receipt_ref(db, expense_id=expense_id, user_id=current_user.id)
+    # Normally generated right after upload; build it now if the pool hasn't yet
+    thumbnail_ref = ensure_thumbnail(receipt_ref) if receipt_ref else None
+    return blob_response(request, thumbnail_ref, "Thumbnail not found")
+
+@app.get("/expenses/{expense_id}/items/{item_id}/image")
+def read_expense_item_image(request: Request, expense_id: str, item_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    image_ref = crud.get_expense_item_image_ref(db, expense_id=expense_id, item_id=item_id, user_id=current_user.id)
+    return blob_response(request, image_ref, "Image not found")
+
+@app.get("/expenses/{expense_id}/items/{item_id}/thumbnail")
+def read_expense_item_thumbnail(request: Request, expense_id: str, item_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    image_ref = crud.get_expense_item_image_ref(db, expense_id=expense_id, item_id=item_id, user_id=current_user.id)
+    thumbnail_ref = ensure_thumbnail(image_ref) if image_ref else None
+    return blob_response(request, thumbnail_ref, "Thumbnail not found")
+
 @app.delete("/expenses/{expense_id}", response_model=schemas.Expense)
 def delete_expense(expense_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     db_expense = crud.delete_expense(db, expense_id=expense_id, user_id=current_user.id)
@@ -242,23 +347,77 @@ def update_expense(expense_id: str, expense: schemas.ExpenseUpdate, db: Session
         raise HTTPException(status_code=404, detail="Expense not found")
     return db_expense
 
+@app.get("/sync", response_model=schemas.SyncResponse)
+def sync(since: Optional[str] = None, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # Delta of expenses, friends and saved items since the token returned by
+    # the previous sync; without one, the full current state
+    try:
+        since_at = decode_cursor(since, datetime.fromisoformat)[0] if since else None
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    changes = crud.get_changes(db, user_id=current_user.id, since=since_at)
+    changes["next_token"] = encode_cursor(changes.pop("synced_at"))
+    return changes
+
+@app.get("/balances", response_model=List[schemas.Balance])
+def read_balances(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return [{"name": name, "balance": balance} for name, balance in balances.get_balances(db, user_id=current_user.id)]
+
+@app.get("/balances/settle", response_model=List[schemas.Transfer])
+def read_settlement(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return [
+        {"debtor": debtor, "creditor": creditor, "amount": amount}
+        for debtor, creditor, amount in balances.get_settlement(db, user_id=current_user.id)
+    ]
+
+@app.get("/search", response_model=List[schemas.SearchResult])
+def search_everything(response: Response, q: str, limit: int = 20, cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # Results are ranked rather than keyed, so the cursor carries an offset
+    try:
+        offset = decode_cursor(cursor, int)[0] if cursor else 0
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = search.search(db, user_id=current_user.id, q=q, limit=limit, offset=offset)
+    if len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit)
+    return [
+        {"kind": kind, "id": row_id, "expense_id": expense_id, "text": matched, "score": score}
+        for kind, row_id, expense_id, matched, score in rows
+    ]
+
 @app.post("/friends/", response_model=schemas.Friend)
 def create_friend(friend: schemas.FriendCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     return crud.create_friend(db=db, friend=friend, user_id=current_user.id)
 
 @app.get("/friends/", response_model=List[schemas.Friend])
-def read_friends(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    friends = crud.get_friends(db, user_id=current_user.id, skip=skip, limit=limit)
-    return friends
+def read_friends(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return paginate(
+        response,
+        lambda: crud.get_friends(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor),
+        limit,
+        crud.name_page_key,
+    )
 
 @app.get("/saved-items/", response_model=List[schemas.SavedItem])
-def read_saved_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    return crud.get_saved_items(db, user_id=current_user.id, skip=skip, limit=limit)
+def read_saved_items(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return paginate(
+        response,
+        lambda: crud.get_saved_items(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor),
+        limit,
+        crud.name_page_key,
+    )
 
 @app.post("/saved-items/", response_model=schemas.SavedItem)
 def create_saved_item(item: schemas.SavedItemCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     return crud.create_saved_item(db=db, item=item, user_id=current_user.id)
 
+@app.get("/saved-items/suggest", response_model=List[schemas.SavedItemSuggestion])
+def suggest_saved_items(prefix: str = "", limit: int = 10, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return [
+        {"id": item_id, "name": name, "default_price": default_price, "uses": uses}
+        for item_id, name, default_price, uses in suggest.suggest(db, user_id=current_user.id, prefix=prefix, limit=limit)
+    ]
+
 @app.put("/saved-items/{item_id}", response_model=schemas.SavedItem)
 def update_saved_item(item_id: str, item: schemas.SavedItemCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     db_item = crud.update_saved_item(db, item_id=item_id, item=item, user_id=current_user.id)
@@ -0,0 +1,40 @@
+import base64
+import binascii
+
+# Magic-number sniffing for the binary payloads we store (receipts, item photos,
+# profile images). Clients don't send a content type with the raw bytes, so we
+# work it out from the header when serving them back.
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+]
+
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+def detect_media_type(data: bytes, default: str = "application/octet-stream") -> str:
+    if not data:
+        return default
+    for signature, media_type in _SIGNATURES:
+        if data.startswith(signature):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in _HEIF_BRANDS:
+        return "image/heic"
+    return default
+
+def decode_image_payload(data: bytes):
+    # The mobile apps send image fields as base64 text; ingest decodes it so
+    # the blob store holds the real image. Returns (raw bytes, was_base64).
+    if detect_media_type(data, default=None) is not None:
+        return data, False
+    try:
+        decoded = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        return data, False
+    if detect_media_type(decoded, default=None) is None:
+        return data, False
+    return decoded, True
@@ -1,9 +1,28 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, LargeBinary, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Integer, Index, Text, text
+from sqlalchemy.orm import relationship, column_property
 from .database import Base
+from .blobstore import blob_property
 import uuid
 from datetime import datetime
 
+def search_indexes(table: str, column: str):
+    # Postgres-only GIN indexes behind app.search: word-prefix matching on
+    # to_tsvector('simple', ...) (same expression as search.tsvector) and
+    # pg_trgm for substring matches. SQLite uses FTS5 instead.
+    return (
+        Index(
+            f"ix_{table}_{column}_tsv",
+            text(f"to_tsvector('simple', coalesce({column}, ''))"),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            f"ix_{table}_{column}_trgm",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,7 +32,8 @@ class User(Base):
     is_active = Column(Integer, default=1)  # 1 for True, 0 for False (SQLite boolean)
     username = Column(String, default="User")
     subtitle = Column(String, default="New User")
-    profile_image_data = Column(LargeBinary, nullable=True)
+    profile_image_ref = Column(String, nullable=True)  # Blob store key
+    profile_image_data = blob_property("profile_image_ref")
 
     expenses = relationship("Expense", back_populates="owner")
     friends = relationship("Friend", back_populates="owner")
@@ -28,25 +48,45 @@ class Expense(Base):
     amount = Column(Float)
     date = Column(DateTime, default=datetime.utcnow)
     category = Column(String)  # Storing Enum as String
-    receipt_data = Column(LargeBinary, nullable=True)
+    receipt_ref = Column(String, nullable=True)  # Blob store key
+    receipt_data = blob_property("receipt_ref")
+    has_receipt = column_property(receipt_ref.isnot(None))
     recipient_email = Column(String, nullable=True)
+    paid_by = Column(String, nullable=True)  # Split name of the payer; NULL is the owner
+    # Bumped on every change, including edits to splits and items; drives /sync
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="expenses")
     splits = relationship("Split", back_populates="expense", cascade="all, delete-orphan")
     items = relationship("ExpenseItem", back_populates="expense", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? ORDER BY date DESC, id DESC
+        Index("ix_expenses_user_id_date_id", "user_id", "date", "id"),
+        Index("ix_expenses_user_id_updated_at", "user_id", "updated_at"),
+        # Category filters in date order, and per-category summaries
+        Index("ix_expenses_user_id_category_date_id", "user_id", "category", "date", "id"),
+        # Filtered lists sorted by amount: WHERE user_id = ? ORDER BY amount DESC, id DESC
+        Index("ix_expenses_user_id_amount_id", "user_id", "amount", "id"),
+        *search_indexes("expenses", "title"),
+    )
+
 class ExpenseItem(Base):
     __tablename__ = "expense_items"
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
-    expense_id = Column(String, ForeignKey("expenses.id"))
+    expense_id = Column(String, ForeignKey("expenses.id"), index=True)
     name = Column(String)
     price = Column(Float)
     quantity = Column(Integer, default=1)
-    image_data = Column(LargeBinary, nullable=True)
+    image_ref = Column(String, nullable=True)  # Blob store key
+    image_data = blob_property("image_ref")
+    has_image = column_property(image_ref.isnot(None))
 
     expense = relationship("Expense", back_populates="items")
 
+    __table_args__ = search_indexes("expense_items", "name")
+
 class Split(Base):
     __tablename__ = "splits"
 
@@ -58,6 +98,11 @@ class Split(Base):
 
     expense = relationship("Expense", back_populates="splits")
 
+    __table_args__ = (
+        # Loading an expense's splits and per-participant summaries
+        Index("ix_splits_expense_id_name", "expense_id", "name"),
+    )
+
 class Friend(Base):
     __tablename__ = "friends"
 
@@ -67,9 +112,15 @@ class Friend(Base):
     initials = Column(String)
     gradient_start = Column(String) # RGBA or Hex
     gradient_end = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="friends")
 
+    __table_args__ = (
+        Index("ix_friends_user_id_name_id", "user_id", "name", "id"),
+        Index("ix_friends_user_id_updated_at", "user_id", "updated_at"),
+    )
+
 class SavedItem(Base):
     __tablename__ = "saved_items"
     
@@ -77,5 +128,61 @@ class SavedItem(Base):
     user_id = Column(String, ForeignKey("users.id"))
     name = Column(String, index=True) # Removed unique=True to allow same name for different users
     default_price = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="saved_items")
+
+    __table_args__ = (
+        Index("ix_saved_items_user_id_name_id", "user_id", "name", "id"),
+        Index("ix_saved_items_user_id_updated_at", "user_id", "updated_at"),
+        *search_indexes("saved_items", "name"),
+    )
+
+class ExpenseRollup(Base):
+    __tablename__ = "expense_rollups"
+
+    # Running totals per user, month ("YYYY-MM") and category, maintained by
+    # app.rollups alongside every expense write
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    month = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, default=0.0)
+    count = Column(Integer, default=0)
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+
+    # One row per deleted expense/friend/saved item so /sync can tell clients
+    # what to drop
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"))
+    resource = Column(String)  # "expense", "friend" or "saved_item"
+    resource_id = Column(String)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    # Written in the same transaction as the expense and drained by app.worker,
+    # so notifications survive restarts and never run on the request path
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), index=True)
+    channel = Column(String)  # "email" or "telegram"
+    recipient = Column(String)  # Email address or Telegram chat id
+    payload = Column(Text)  # JSON template data
+    attachment_ref = Column(String, nullable=True)  # Blob store key of the receipt
+    status = Column(String, default="pending")  # pending, sending, sent, dead
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The worker's claim query: WHERE status IN (...) AND next_attempt_at <= now
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
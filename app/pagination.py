@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+
+# Opaque keyset cursors. A cursor is the sort key of the last row on a page,
+# JSON-encoded and base64'd so clients treat it as a token rather than
+# something to construct themselves.
+
+class InvalidCursor(ValueError):
+    pass
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types):
+    # `types` are the parsers for each key column, e.g. (datetime.fromisoformat, str)
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor("Malformed cursor")
+        return [parse(value) for parse, value in zip(types, values)]
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+def next_cursor(rows, limit: int, key):
+    # A short page means there is nothing after it
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(*key(rows[-1]))
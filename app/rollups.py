@@ -0,0 +1,111 @@
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, database
+
+# Per-user (month, category) -> total/count rollups, so dashboard summaries
+# read a row per month instead of scanning every expense. crud keeps them in
+# step inside the same transaction as the expense write; after a bulk import
+# or manual SQL, rebuild them with:
+#
+#     python -m app.rollups rebuild [--user USER_ID]
+
+def month_key(date: datetime) -> str:
+    return date.strftime("%Y-%m")
+
+def period_expression(dialect: str, column, period: str):
+    # Bucket label for a timestamp. Weeks are labelled by their Monday so both
+    # dialects agree without relying on ISO week support in SQLite.
+    if dialect == "postgresql":
+        if period == "week":
+            return func.to_char(func.date_trunc("week", column), "YYYY-MM-DD")
+        return func.to_char(column, "YYYY-MM-DD" if period == "day" else "YYYY-MM")
+    if period == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-%d" if period == "day" else "%Y-%m", column)
+
+def _upsert(dialect: str, rows):
+    table = models.ExpenseRollup.__table__
+    module = postgresql if dialect == "postgresql" else sqlite
+    stmt = module.insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.month, table.c.category],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "count": table.c.count + stmt.excluded.count,
+        }
+    )
+
+def apply(db: Session, changes):
+    # `changes` is an iterable of (user_id, date, category, amount, count)
+    # deltas; a delete is the negative of its create
+    deltas = defaultdict(lambda: [0.0, 0])
+    for user_id, date, category, amount, count in changes:
+        delta = deltas[(user_id, month_key(date), category)]
+        delta[0] += amount or 0.0
+        delta[1] += count
+    rows = [
+        {"user_id": user_id, "month": month, "category": category, "total": total, "count": count}
+        for (user_id, month, category), (total, count) in deltas.items()
+        if count or total
+    ]
+    if rows:
+        db.execute(_upsert(db.get_bind().dialect.name, rows))
+
+def expense_delta(expense, sign: int = 1):
+    # Rollup delta for an Expense (or anything with the same attributes)
+    return (expense.user_id, expense.date, expense.category, sign * (expense.amount or 0.0), sign)
+
+def rebuild(db: Session, user_id: str = None):
+    # Recomputes rollups from the expenses table, for one user or everyone
+    table = models.ExpenseRollup.__table__
+    month = period_expression(db.get_bind().dialect.name, models.Expense.date, "month")
+    source = select(
+        models.Expense.user_id,
+        month,
+        models.Expense.category,
+        func.sum(models.Expense.amount),
+        func.count(models.Expense.id)
+    ).group_by(models.Expense.user_id, month, models.Expense.category)
+    clear = delete(table)
+    if user_id is not None:
+        source = source.where(models.Expense.user_id == user_id)
+        clear = clear.where(table.c.user_id == user_id)
+    db.execute(clear)
+    db.execute(insert(table).from_select(["user_id", "month", "category", "total", "count"], source))
+    db.commit()
+
+def get_summary(db: Session, user_id: str, group_by: str, start_month: str = None, end_month: str = None):
+    # Category or month totals from the rollups: [(key, total, count)].
+    # Months are "YYYY-MM"; start is inclusive, end exclusive.
+    rollup = models.ExpenseRollup
+    key = rollup.category if group_by == "category" else rollup.month
+    query = db.query(key, func.sum(rollup.total), func.sum(rollup.count)).filter(rollup.user_id == user_id)
+    if start_month is not None:
+        query = query.filter(rollup.month >= start_month)
+    if end_month is not None:
+        query = query.filter(rollup.month < end_month)
+    rows = query.group_by(key).having(func.sum(rollup.count) > 0).order_by(key).all()
+    return [(bucket, total or 0.0, count) for bucket, total, count in rows]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="Recompute rollups from the expenses table")
+    rebuild_parser.add_argument("--user", help="Only rebuild this user id")
+    args = parser.parse_args(argv)
+
+    db = database.SessionLocal()
+    try:
+        rebuild(db, user_id=args.user)
+        print(f"✅ Rebuilt expense rollups for {args.user or 'all users'}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
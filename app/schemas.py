@@ -1,8 +1,16 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import base64
+from pydantic import BaseModel, Field, PlainSerializer
+from typing import Annotated, List, Optional
 from datetime import datetime
 from enum import Enum
 
+# Image payloads: the apps send base64 text, the blob store keeps the raw
+# bytes, and responses carry base64 again so the JSON shape is unchanged
+ImageData = Annotated[
+    bytes,
+    PlainSerializer(lambda data: base64.b64encode(data).decode(), return_type=str, when_used="json-unless-none")
+]
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -22,7 +30,18 @@ class User(UserBase):
     is_active: bool
     username: Optional[str] = "User"
     subtitle: Optional[str] = "New User"
-    profile_image_data: Optional[bytes] = None
+    profile_image_data: Optional[ImageData] = None
+
+    class Config:
+        from_attributes = True
+
+# What get_current_user hands to the endpoints: everything except the
+# profile image, small enough to keep in the per-worker user cache
+class AuthenticatedUser(UserBase):
+    id: str
+    is_active: bool
+    username: Optional[str] = "User"
+    subtitle: Optional[str] = "New User"
 
     class Config:
         from_attributes = True
@@ -30,7 +49,7 @@ class User(UserBase):
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     subtitle: Optional[str] = None
-    profile_image_data: Optional[bytes] = None
+    profile_image_data: Optional[ImageData] = None
 
 class ExpenseCategory(str, Enum):
     lodging = "Lodging"
@@ -38,6 +57,30 @@ class ExpenseCategory(str, Enum):
     activities = "Fun"
     transport = "Transport"
 
+class ExpenseSort(str, Enum):
+    date = "date"  # Newest first
+    amount = "amount"  # Largest first
+
+class ExpenseFilters(BaseModel):
+    start: Optional[datetime] = None  # Inclusive
+    end: Optional[datetime] = None  # Exclusive
+    category: Optional[ExpenseCategory] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    participant: Optional[str] = None  # Split name
+
+class SummaryGrouping(str, Enum):
+    category = "category"
+    day = "day"
+    week = "week"  # Keyed by the week's Monday
+    month = "month"
+    participant = "participant"  # Split name
+
+class SummaryBucket(BaseModel):
+    key: str
+    total: float
+    count: int
+
 class SplitBase(BaseModel):
     name: str
     initials: str
@@ -46,6 +89,11 @@ class SplitBase(BaseModel):
 class SplitCreate(SplitBase):
     pass
 
+# In updates, an id matching an existing split edits it in place; entries
+# without one are added
+class SplitUpdate(SplitBase):
+    id: Optional[str] = None
+
 class Split(SplitBase):
     id: str
     expense_id: str
@@ -57,11 +105,17 @@ class ExpenseItemBase(BaseModel):
     name: str
     price: float
     quantity: int = 1
-    image_data: Optional[bytes] = None
+    image_data: Optional[ImageData] = None
 
 class ExpenseItemCreate(ExpenseItemBase):
     pass
 
+# In updates, an id matching an existing item edits it in place. For those,
+# image_data is optional: leaving it out keeps the stored photo
+class ExpenseItemUpdate(ExpenseItemBase):
+    id: Optional[str] = None
+    clear_image: bool = False
+
 class ExpenseItem(ExpenseItemBase):
     id: str
     expense_id: str
@@ -69,40 +123,69 @@ class ExpenseItem(ExpenseItemBase):
     class Config:
         from_attributes = True
 
+# Lightweight projection used by list endpoints: the photo itself is fetched
+# separately from /expenses/{expense_id}/items/{item_id}/image
+class ExpenseItemListItem(BaseModel):
+    id: str
+    expense_id: str
+    name: str
+    price: float
+    quantity: int = 1
+    has_image: bool = False
+
+    class Config:
+        from_attributes = True
+
 class ExpenseBase(BaseModel):
     title: str
     amount: float
     date: datetime
     category: ExpenseCategory
+    paid_by: Optional[str] = None  # Split name of whoever paid; None means the account owner
 
 class ExpenseCreate(ExpenseBase):
-    receipt_data: Optional[bytes] = None
+    receipt_data: Optional[ImageData] = None
     recipient_email: Optional[str] = None
     telegram_chat_id: Optional[str] = None
     splits: List[SplitCreate] = []
     items: List[ExpenseItemCreate] = []
 
+# Offline clients flush their queue in one request
+EXPENSE_BATCH_MAX_SIZE = 200
+
+class ExpenseBatchCreate(BaseModel):
+    expenses: List[ExpenseCreate] = Field(..., min_length=1, max_length=EXPENSE_BATCH_MAX_SIZE)
+
+class ExpenseBatchResult(BaseModel):
+    index: int  # Position in the request's expenses list
+    status: str  # "created" or "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
 class ExpenseUpdate(BaseModel):
     title: Optional[str] = None
     amount: Optional[float] = None
     date: Optional[datetime] = None
     category: Optional[ExpenseCategory] = None
-    receipt_data: Optional[bytes] = None
+    receipt_data: Optional[ImageData] = None
     recipient_email: Optional[str] = None
-    splits: Optional[List[SplitCreate]] = None
-    items: Optional[List[ExpenseItemCreate]] = None
+    paid_by: Optional[str] = None
+    splits: Optional[List[SplitUpdate]] = None
+    items: Optional[List[ExpenseItemUpdate]] = None
 
 class ExpenseListItem(ExpenseBase):
     id: str
     recipient_email: Optional[str] = None
+    has_receipt: bool = False
     splits: List[Split] = []
-    items: List[ExpenseItem] = []
+    items: List[ExpenseItemListItem] = []
 
     class Config:
         from_attributes = True
 
 class Expense(ExpenseListItem):
-    receipt_data: Optional[bytes] = None
+    receipt_data: Optional[ImageData] = None
+    items: List[ExpenseItem] = []
 
 class FriendBase(BaseModel):
     name: str
@@ -131,3 +214,34 @@ class SavedItem(SavedItemBase):
 
     class Config:
         from_attributes = True
+
+class SavedItemSuggestion(SavedItem):
+    uses: int = 0  # How many expense items carry this name
+
+class SyncDeleted(BaseModel):
+    expenses: List[str] = []
+    friends: List[str] = []
+    saved_items: List[str] = []
+
+class SyncResponse(BaseModel):
+    expenses: List[ExpenseListItem] = []
+    friends: List[Friend] = []
+    saved_items: List[SavedItem] = []
+    deleted: SyncDeleted = SyncDeleted()
+    next_token: str  # Pass back as ?since= on the next sync
+
+class SearchResult(BaseModel):
+    kind: str  # "expense", "expense_item" or "saved_item"
+    id: str
+    expense_id: Optional[str] = None  # Set for expenses and expense items
+    text: str  # The matched title or name
+    score: float  # Higher is a better match
+
+class Balance(BaseModel):
+    name: str  # Split name, or "You" for the account owner
+    balance: float  # Positive: is owed money; negative: owes money
+
+class Transfer(BaseModel):
+    debtor: str
+    creditor: str
+    amount: float
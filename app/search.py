@@ -0,0 +1,160 @@
+import re
+
+from sqlalchemy import String, event, func, literal, literal_column, or_, select, text, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Search over expense titles, expense item names and saved item names.
+#
+# SQLite: every searchable row is mirrored into search_documents by triggers
+# on the source tables, and search_documents feeds an FTS5 index (external
+# content keyed by its INTEGER PRIMARY KEY, so rowids survive VACUUM).
+# Postgres: the source tables are queried directly through GIN indexes on
+# to_tsvector('simple', ...) for word-prefix matches and pg_trgm for substrings
+# (declared on the models, Postgres-only).
+
+# (table, kind, text column, user_id expression, expense_id expression)
+SEARCH_SOURCES = (
+    ("expenses", "expense", "title", "NEW.user_id", "NEW.id"),
+    ("expense_items", "expense_item", "name", "(SELECT user_id FROM expenses WHERE id = NEW.expense_id)", "NEW.expense_id"),
+    ("saved_items", "saved_item", "name", "NEW.user_id", "NULL"),
+)
+
+SQLITE_INDEX_DDL = [
+    """CREATE TABLE IF NOT EXISTS search_documents (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        row_id TEXT NOT NULL,
+        user_id TEXT,
+        expense_id TEXT,
+        text TEXT
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_search_documents_kind_row_id ON search_documents (kind, row_id)",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        text, content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_fts (search_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_fts (search_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+        INSERT INTO search_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END""",
+]
+
+for _table, _kind, _column, _user, _expense in SEARCH_SOURCES:
+    SQLITE_INDEX_DDL += [
+        f"""CREATE TRIGGER IF NOT EXISTS {_table}_search_ai AFTER INSERT ON {_table} BEGIN
+            INSERT INTO search_documents (kind, row_id, user_id, expense_id, text)
+            VALUES ('{_kind}', NEW.id, {_user}, {_expense}, NEW.{_column});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {_table}_search_au AFTER UPDATE OF {_column} ON {_table} BEGIN
+            UPDATE search_documents SET text = NEW.{_column} WHERE kind = '{_kind}' AND row_id = NEW.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {_table}_search_ad AFTER DELETE ON {_table} BEGIN
+            DELETE FROM search_documents WHERE kind = '{_kind}' AND row_id = OLD.id;
+        END""",
+    ]
+
+def is_index_table(name: str) -> bool:
+    # search_documents, search_fts and the FTS5 shadow tables (search_fts_data, ...)
+    return name == "search_documents" or name == "search_fts" or name.startswith("search_fts_")
+
+def _backfill_statements():
+    for table, kind, column, user, expense in SEARCH_SOURCES:
+        yield (
+            f"INSERT INTO search_documents (kind, row_id, user_id, expense_id, text) "
+            f"SELECT '{kind}', NEW.id, {user}, {expense}, NEW.{column} FROM {table} AS NEW"
+        )
+
+def install_sqlite_index(connection):
+    # Idempotent; indexes existing rows the first time it runs
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_documents'")
+    ).first()
+    for statement in SQLITE_INDEX_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        for statement in _backfill_statements():
+            connection.execute(text(statement))
+
+def drop_sqlite_index(connection):
+    for table, _, _, _, _ in SEARCH_SOURCES:
+        for suffix in ("ai", "au", "ad"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_{suffix}"))
+    connection.execute(text("DROP TABLE IF EXISTS search_fts"))
+    connection.execute(text("DROP TABLE IF EXISTS search_documents"))
+
+@event.listens_for(models.Base.metadata, "before_create")
+def _before_create(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        install_sqlite_index(connection)
+
+@event.listens_for(models.Base.metadata, "before_drop")
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        drop_sqlite_index(connection)
+
+def search_terms(q: str):
+    return re.findall(r"\w+", q.lower())
+
+def _search_sqlite(db: Session, user_id: str, terms, limit: int, offset: int):
+    # Every term must match, each as a prefix; bm25 is lower-is-better
+    match = " ".join(f'"{term}"*' for term in terms)
+    return db.execute(
+        text(
+            "SELECT d.kind, d.row_id, d.expense_id, d.text, -bm25(search_fts) AS score "
+            "FROM search_fts JOIN search_documents AS d ON d.id = search_fts.rowid "
+            "WHERE search_fts MATCH :match AND d.user_id = :user_id "
+            "ORDER BY bm25(search_fts), d.row_id LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "user_id": user_id, "limit": limit, "offset": offset}
+    ).all()
+
+def tsvector(column):
+    # Must stay identical to the GIN index expressions in models.py
+    return func.to_tsvector(literal_column("'simple'"), func.coalesce(column, literal_column("''")))
+
+def _search_postgresql(db: Session, user_id: str, q: str, terms, limit: int, offset: int):
+    query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+    pattern = f"%{q.strip()}%"
+
+    def source(kind, row_id, expense_id, column, *where):
+        return select(
+            literal(kind).label("kind"),
+            row_id.label("row_id"),
+            expense_id.label("expense_id"),
+            column.label("text"),
+            (func.ts_rank(tsvector(column), query) + func.similarity(column, q)).label("score")
+        ).where(or_(tsvector(column).op("@@")(query), column.ilike(pattern)), *where)
+
+    combined = union_all(
+        source("expense", models.Expense.id, models.Expense.id, models.Expense.title, models.Expense.user_id == user_id),
+        source(
+            "expense_item", models.ExpenseItem.id, models.ExpenseItem.expense_id, models.ExpenseItem.name,
+            models.ExpenseItem.expense_id == models.Expense.id, models.Expense.user_id == user_id
+        ),
+        source("saved_item", models.SavedItem.id, literal(None, String), models.SavedItem.name, models.SavedItem.user_id == user_id),
+    ).subquery()
+    return db.execute(
+        select(combined).order_by(combined.c.score.desc(), combined.c.row_id).limit(limit).offset(offset)
+    ).all()
+
+def search(db: Session, user_id: str, q: str, limit: int = 20, offset: int = 0):
+    # Ranked matches, best first: [(kind, row_id, expense_id, text, score)]
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgresql(db, user_id, q, terms, limit, offset)
+    return _search_sqlite(db, user_id, terms, limit, offset)
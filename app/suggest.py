@@ -0,0 +1,124 @@
+import os
+import threading
+from bisect import bisect_left, insort
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+
+# Saved-item autocomplete. Each user's saved items are kept in memory as a
+# sorted list of casefolded names, so a keystroke is a bisect plus a short
+# scan instead of a query. Indexes are built on first use, patched by the
+# saved-item crud functions, and held in an LRU over users; the TTL bounds how
+# stale usage counts (and writes handled by other workers) can get.
+
+SUGGEST_INDEX_MAX_USERS = int(os.getenv("SUGGEST_INDEX_MAX_USERS", 256))
+SUGGEST_INDEX_TTL_SECONDS = float(os.getenv("SUGGEST_INDEX_TTL_SECONDS", 600))
+
+def _key(name: str) -> str:
+    return (name or "").casefold()
+
+class PrefixIndex:
+    def __init__(self, items=(), usage=None):
+        # items: (id, name, default_price); usage: casefolded name -> uses
+        self._lock = threading.Lock()
+        self._keys = []  # Sorted (casefolded name, id)
+        self._items = {}
+        self._usage = dict(usage or {})
+        for item_id, name, default_price in items:
+            self._items[item_id] = (name, default_price)
+            self._keys.append((_key(name), item_id))
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item_id: str, name: str, default_price: float):
+        with self._lock:
+            self._remove(item_id)
+            self._items[item_id] = (name, default_price)
+            insort(self._keys, (_key(name), item_id))
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id: str):
+        current = self._items.pop(item_id, None)
+        if current is not None:
+            entry = (_key(current[0]), item_id)
+            position = bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    def record_usage(self, names):
+        with self._lock:
+            for name in names:
+                key = _key(name)
+                self._usage[key] = self._usage.get(key, 0) + 1
+
+    def suggest(self, prefix: str, limit: int = 10):
+        # Most used first, then alphabetical: [(id, name, default_price, uses)]
+        prefix = _key(prefix)
+        with self._lock:
+            matches = []
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+                key, item_id = self._keys[position]
+                matches.append((-self._usage.get(key, 0), key, item_id))
+                position += 1
+            matches.sort()
+            return [
+                (item_id, *self._items[item_id], -negative_uses)
+                for negative_uses, _, item_id in matches[:limit]
+            ]
+
+suggest_indexes = TTLCache(SUGGEST_INDEX_MAX_USERS, SUGGEST_INDEX_TTL_SECONDS)
+
+def build_index(db: Session, user_id: str) -> PrefixIndex:
+    items = (
+        db.query(models.SavedItem.id, models.SavedItem.name, models.SavedItem.default_price)
+        .filter(models.SavedItem.user_id == user_id)
+        .all()
+    )
+    usage = (
+        db.query(func.lower(models.ExpenseItem.name), func.count(models.ExpenseItem.id))
+        .join(models.Expense, models.Expense.id == models.ExpenseItem.expense_id)
+        .filter(models.Expense.user_id == user_id)
+        .group_by(func.lower(models.ExpenseItem.name))
+        .all()
+    )
+    counts = {}
+    for name, uses in usage:
+        # SQL lower() and casefold() only differ outside ASCII; merge anyway
+        counts[_key(name)] = counts.get(_key(name), 0) + uses
+    return PrefixIndex(items, counts)
+
+def get_index(db: Session, user_id: str) -> PrefixIndex:
+    index = suggest_indexes.get(user_id)
+    if index is None:
+        index = build_index(db, user_id)
+        suggest_indexes.set(user_id, index)
+    return index
+
+def suggest(db: Session, user_id: str, prefix: str, limit: int = 10):
+    return get_index(db, user_id).suggest(prefix, limit)
+
+# Write hooks: only patch indexes that are already loaded
+
+def saved_item_changed(user_id: str, item_id: str, name: str, default_price: float):
+    index = suggest_indexes.peek(user_id)
+    if index is not None:
+        index.add(item_id, name, default_price)
+
+def saved_item_deleted(user_id: str, item_id: str):
+    index = suggest_indexes.peek(user_id)
+    if index is not None:
+        index.remove(item_id)
+
+def items_used(user_id: str, names):
+    index = suggest_indexes.peek(user_id)
+    if index is not None:
+        index.record_usage(names)
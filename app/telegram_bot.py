@@ -1,18 +1,139 @@
+import asyncio
 import os
-from telegram import Bot
+import time
+import weakref
+import httpx
 from dotenv import load_dotenv
+from .media import detect_media_type
 
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+# Telegram allows roughly one message per second per chat; short bursts are tolerated
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", 3))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", 3))
+MAX_TRACKED_CHATS = 10000
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        # Server said slow down (429 retry_after): hold this chat until then
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+class TelegramClient:
+    # One long-lived HTTP client per process: connections to the Bot API are
+    # kept alive (HTTP/2 when h2 is installed) instead of a new TLS handshake
+    # for every notification.
+    def __init__(self, token: str, base_url: str = TELEGRAM_API_BASE, rate: float = TELEGRAM_CHAT_RATE, burst: int = TELEGRAM_CHAT_BURST, max_retries: int = TELEGRAM_MAX_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._http = httpx.AsyncClient(
+            base_url=f"{base_url}/bot{token}",
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+            timeout=httpx.Timeout(30, connect=10),
+        )
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CHATS:
+                self._prune_buckets()
+            bucket = self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _prune_buckets(self):
+        # A bucket that has refilled completely carries no state worth keeping
+        now = time.monotonic()
+        for chat_id, bucket in list(self._buckets.items()):
+            bucket._refill(now)
+            if bucket.tokens >= bucket.capacity and bucket.blocked_until <= now:
+                del self._buckets[chat_id]
+
+    async def call(self, method: str, chat_id, data: dict, files: dict = None) -> httpx.Response:
+        bucket = self._bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            response = await self._http.post(f"/{method}", data={"chat_id": chat_id, **data}, files=files)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+            except ValueError:
+                retry_after = 1
+            print(f"⏳ Telegram rate limited chat {chat_id}, retrying in {retry_after}s")
+            bucket.pause(retry_after)
+        return response
+
+    async def send_message(self, chat_id, text: str) -> httpx.Response:
+        return await self.call("sendMessage", chat_id, {"text": text})
+
+    async def send_photo(self, chat_id, photo: bytes, caption: str) -> httpx.Response:
+        media_type = detect_media_type(photo, default="image/jpeg")
+        extension = media_type.split("/")[-1]
+        return await self.call("sendPhoto", chat_id, {"caption": caption}, files={"photo": (f"receipt.{extension}", photo, media_type)})
+
+    async def aclose(self):
+        await self._http.aclose()
+
+# httpx connections belong to the loop that opened them, so keep one client per loop
+_clients = weakref.WeakKeyDictionary()
+
+def get_telegram_client() -> TelegramClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = TelegramClient(TELEGRAM_BOT_TOKEN)
+    return client
+
+async def close_telegram_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+class TelegramError(Exception):
+    pass
 
 async def send_telegram_notification(chat_id: str, expense_data: dict, receipt_data: bytes = None):
+    # Raises on failure so the outbox worker can record why
     if not TELEGRAM_BOT_TOKEN:
-        print("TELEGRAM_BOT_TOKEN not set")
-        return False
+        raise TelegramError("TELEGRAM_BOT_TOKEN not set")
 
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-    
     message = (
         f"Dear {expense_data.get('recipient_name', 'User')},\n"
         f"You have a new expense from {expense_data.get('sender_name', 'We Expense App')}.\n\n"
@@ -23,49 +144,10 @@ async def send_telegram_notification(chat_id: str, expense_data: dict, receipt_d
         f"Powered by: https://weexpense.com"
     )
 
-    try:
-        if receipt_data:
-            # Debugging: Print first 20 bytes to check if it's a valid image header
-            print(f"📸 Received receipt_data: {len(receipt_data)} bytes")
-            print(f"🔍 Header (Hex): {receipt_data[:20].hex()}")
-            
-            # Check if it needs explicit Base64 decoding (sometimes Pydantic/FastAPI interactions vary)
-            import base64
-            # If it doesn't look like a JPEG (FF D8) or PNG (89 50), try decoding
-            # Common Headers: JPEG=ffd8..., PNG=89504e47...
-            header = receipt_data[:4]
-            if header != b'\xff\xd8\xff\xe0' and header != b'\xff\xd8\xff\xe1' and header != b'\x89\x50\x4e\x47':
-                try:
-                    # Attempt to decode if it looks like base64 chars
-                    decoded_data = base64.b64decode(receipt_data)
-                    print("⚠️ Data was Base64 encoded. Decoded successfully.")
-                    receipt_data = decoded_data
-                except Exception:
-                    # Not base64 or failed, proceed with original
-                    pass
-
-            # Use httpx for direct API call to avoid library issues with file handling
-            import httpx
-            
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-            
-            data = {
-                "chat_id": chat_id,
-                "caption": message
-            }
-            
-            files = {
-                "photo": ("receipt.jpg", receipt_data, "image/jpeg")
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, data=data, files=files)
-                if response.status_code != 200:
-                    print(f"Telegram API Error: {response.text}")
-                    return False
-        else:
-            await bot.send_message(chat_id=chat_id, text=message)
-        return True
-    except Exception as e:
-        print(f"Error sending Telegram message: {e}")
-        return False
+    client = get_telegram_client()
+    if receipt_data:
+        response = await client.send_photo(chat_id, receipt_data, caption=message)
+    else:
+        response = await client.send_message(chat_id, message)
+    if response.status_code != 200:
+        raise TelegramError(f"Telegram API error {response.status_code}: {response.text}")
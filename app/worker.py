@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from . import models, database
+from .blobstore import get_blob_store
+from .email import send_receipt_email, close_mail_pool
+from .telegram_bot import send_telegram_notification, close_telegram_client
+
+# Drains the notification outbox. Run it as its own process next to the API:
+#
+#     python -m app.worker
+#
+# Rows are claimed by moving them to "sending" with a lease; if the worker dies
+# mid-delivery the lease expires and another pass picks the row up again.
+# Senders raise on failure and the error text is kept in last_error.
+# Failures are retried with exponential backoff and jitter until
+# OUTBOX_MAX_ATTEMPTS, after which the row is parked as "dead".
+
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 4))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 2))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 300))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", 10))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 3600))
+
+async def _send_email(message, attachment):
+    return await send_receipt_email(message["recipient"], message["payload"], attachment)
+
+async def _send_telegram(message, attachment):
+    return await send_telegram_notification(message["recipient"], message["payload"], attachment)
+
+SENDERS = {
+    "email": _send_email,
+    "telegram": _send_telegram,
+}
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+    # Jitter so a burst of failures doesn't retry in lockstep
+    return delay * random.uniform(0.5, 1.0)
+
+def claim_batch(db: Session, limit: int = OUTBOX_BATCH_SIZE):
+    now = datetime.utcnow()
+    rows = (
+        db.query(models.NotificationOutbox)
+        .filter(
+            models.NotificationOutbox.status.in_(["pending", "sending"]),
+            models.NotificationOutbox.next_attempt_at <= now,
+        )
+        .order_by(models.NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for row in rows:
+        row.status = "sending"
+        row.next_attempt_at = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed.append({
+            "id": row.id,
+            "channel": row.channel,
+            "recipient": row.recipient,
+            "payload": json.loads(row.payload),
+            "attachment_ref": row.attachment_ref,
+        })
+    db.commit()
+    return claimed
+
+def record_result(db: Session, message_id: str, error: str = None):
+    row = db.query(models.NotificationOutbox).filter(models.NotificationOutbox.id == message_id).first()
+    if row is None:
+        return
+    row.attempts = (row.attempts or 0) + 1
+    if error is None:
+        row.status = "sent"
+        row.sent_at = datetime.utcnow()
+        row.last_error = None
+    elif row.attempts >= OUTBOX_MAX_ATTEMPTS:
+        row.status = "dead"
+        row.last_error = error
+    else:
+        row.status = "pending"
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(row.attempts))
+        row.last_error = error
+    db.commit()
+
+async def deliver(message):
+    sender = SENDERS.get(message["channel"])
+    if sender is None:
+        return f"Unknown channel: {message['channel']}"
+    try:
+        attachment = None
+        if message["attachment_ref"]:
+            attachment = await asyncio.to_thread(get_blob_store().get, message["attachment_ref"])
+        await sender(message, attachment)
+        return None
+    except Exception as e:
+        # Stored as last_error, so a dead-lettered row says what went wrong
+        return str(e) or type(e).__name__
+
+async def process_batch(db: Session, concurrency: int = OUTBOX_CONCURRENCY):
+    messages = await asyncio.to_thread(claim_batch, db)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(message):
+        async with semaphore:
+            error = await deliver(message)
+        if error:
+            print(f"⚠️ Notification {message['id']} ({message['channel']}) failed: {error}")
+        return message["id"], error
+
+    results = await asyncio.gather(*(run(message) for message in messages))
+    # Results are written back sequentially: the session is not shared across threads at once
+    for message_id, error in results:
+        await asyncio.to_thread(record_result, db, message_id, error)
+    return len(messages)
+
+async def run_forever():
+    print(f"📬 Outbox worker started (concurrency={OUTBOX_CONCURRENCY})")
+    try:
+        await _poll()
+    finally:
+        # Pooled SMTP connections and the Telegram HTTP client live for the
+        # whole worker process
+        await close_mail_pool()
+        await close_telegram_client()
+
+async def _poll():
+    while True:
+        if database.SessionLocal is None and not database.init_db():
+            await asyncio.sleep(OUTBOX_POLL_SECONDS)
+            continue
+        db = database.SessionLocal()
+        try:
+            processed = await process_batch(db)
+        except Exception as e:
+            print(f"❌ Outbox worker error: {e}")
+            processed = 0
+        finally:
+            db.close()
+        # A full batch means there is probably more waiting
+        if processed < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_SECONDS)
+
+if __name__ == "__main__":
+    asyncio.run(run_forever())
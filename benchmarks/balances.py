@@ -0,0 +1,106 @@
+"""Balance / settle-up latency over synthetic data.
+
+    python -m benchmarks.balances [expenses] [participants]
+
+Compares loading every expense and split and summing in Python (what the
+clients do today) with app.balances, which aggregates in SQL. Runs against
+BENCH_DATABASE_URL (default: a throwaway SQLite file).
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app import balances, models
+from app.database import Base
+
+
+def seed(Session, expenses: int, participants: int):
+    rng = random.Random(25)
+    names = [f"Friend {i}" for i in range(participants)]
+    with Session() as db:
+        user = models.User(email=f"bench-{uuid.uuid4()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        expense_rows, split_rows = [], []
+        for i in range(expenses):
+            expense_id = str(uuid.uuid4())
+            amount = round(rng.uniform(5, 500), 2)
+            members = rng.sample(names + [balances.SELF], rng.randint(2, 6))
+            expense_rows.append({
+                "id": expense_id, "user_id": user.id, "title": f"Expense {i}", "amount": amount,
+                "date": datetime(2020, 1, 1) + timedelta(hours=i), "category": "Food",
+                "paid_by": rng.choice([None, None, rng.choice(names)]),
+            })
+            equal = rng.random() < 0.5
+            for name in members:
+                split_rows.append({
+                    "id": str(uuid.uuid4()), "expense_id": expense_id, "name": name, "initials": name[0],
+                    "amount": None if equal else round(amount / len(members), 2),
+                })
+        db.execute(insert(models.Expense), expense_rows)
+        db.execute(insert(models.Split), split_rows)
+        db.commit()
+        return user.id, len(split_rows)
+
+
+def python_balances(db, user_id):
+    # Baseline: load the whole history and net it in Python
+    net = defaultdict(float)
+    expenses = (
+        db.query(models.Expense)
+        .options(selectinload(models.Expense.splits))
+        .filter(models.Expense.user_id == user_id)
+        .all()
+    )
+    for expense in expenses:
+        payer = expense.paid_by or balances.SELF
+        for split in expense.splits:
+            share = split.amount if split.amount is not None else expense.amount / len(expense.splits)
+            net[payer] += share
+            net[split.name] -= share
+    return balances.settle(sorted(net.items()))
+
+
+def sql_balances(db, user_id):
+    return balances.get_settlement(db, user_id)
+
+
+def time_it(fn, Session, user_id, rounds):
+    timings = []
+    for _ in range(rounds):
+        with Session() as db:
+            started = time.perf_counter()
+            result = fn(db, user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+
+def main():
+    expenses = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    user_id, splits = seed(Session, expenses, participants)
+    print(f"{expenses} expenses, {splits} splits, {participants + 1} participants")
+    results = {}
+    for name, fn in (("load + Python", python_balances), ("SQL aggregate", sql_balances)):
+        time_it(fn, Session, user_id, 2)  # warm up
+        timings, results[name] = time_it(fn, Session, user_id, 10)
+        print(f"{name:>14}: mean {statistics.mean(timings):.1f} ms  median {statistics.median(timings):.1f} ms  "
+              f"({len(results[name])} transfers)")
+
+
+if __name__ == "__main__":
+    main()
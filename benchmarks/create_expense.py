@@ -0,0 +1,96 @@
+"""Create-expense latency: the old two-commit path vs. crud.create_expense.
+
+    python -m benchmarks.create_expense [iterations]
+
+Runs against BENCH_DATABASE_URL (default: a throwaway SQLite file). Point it
+at Postgres to see the fsync saved by committing once.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base
+
+
+def legacy_create_expense(db, expense, user_id):
+    # Previous implementation: commit the parent for its id, add the
+    # children, commit again, refresh twice
+    db_expense = models.Expense(
+        user_id=user_id,
+        title=expense.title,
+        amount=expense.amount,
+        date=expense.date,
+        category=expense.category.value,
+        recipient_email=expense.recipient_email
+    )
+    db.add(db_expense)
+    db.commit()
+    db.refresh(db_expense)
+    for split in expense.splits:
+        db.add(models.Split(expense_id=db_expense.id, name=split.name, initials=split.initials, amount=split.amount))
+    for item in expense.items:
+        db.add(models.ExpenseItem(expense_id=db_expense.id, name=item.name, price=item.price, quantity=item.quantity))
+    db.commit()
+    db.refresh(db_expense)
+    schemas.Expense.model_validate(db_expense)
+    return db_expense
+
+
+def current_create_expense(db, expense, user_id):
+    return schemas.Expense.model_validate(crud.create_expense(db, expense, user_id))
+
+
+def sample_expense():
+    return schemas.ExpenseCreate(
+        title="Dinner",
+        amount=90.0,
+        date=datetime(2026, 1, 1, 20, 0),
+        category=schemas.ExpenseCategory.food,
+        splits=[schemas.SplitCreate(name=name, initials=name, amount=30.0) for name in "ABC"],
+        items=[schemas.ExpenseItemCreate(name=f"Dish {i}", price=15.0) for i in range(6)]
+    )
+
+
+def run(fn, Session, user_id, iterations):
+    expense = sample_expense()
+    timings = []
+    for _ in range(iterations):
+        with Session() as db:
+            started = time.perf_counter()
+            fn(db, expense, user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        user = models.User(email=f"bench-{time.time()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    print(f"{iterations} creates against {engine.url.render_as_string(hide_password=True)}")
+    for name, fn in (("two commits + refresh", legacy_create_expense), ("single commit", current_create_expense)):
+        run(fn, Session, user_id, min(iterations, 20))  # warm up
+        timings = run(fn, Session, user_id, iterations)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{name:>22}: mean {statistics.mean(timings):.2f} ms  median {statistics.median(timings):.2f} ms  p95 {p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,25 @@
+import os
+import tempfile
 import pytest
-from sqlalchemy import create_engine
+
+# Keep blobs written by the tests out of the working tree
+os.environ.setdefault("BLOB_STORE_PATH", tempfile.mkdtemp(prefix="we-expense-blobs-"))
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
-from app.main import app, get_db
-from app.models import Base
+from app.main import app, get_db, get_current_user
+from app.models import Base, User
+from app import auth
+from app.cache import user_cache
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Use a local SQLite database for testing; TEST_DATABASE_URL points the
+# suite at another database (e.g. Postgres, for the query-plan tests)
+SQLALCHEMY_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///./test.db")
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -30,7 +40,14 @@ def db_session(test_db):
     connection.close()
 
 @pytest.fixture
-def client(db_session):
+def test_user(db_session):
+    user = User(email="tester@example.com", hashed_password="not-a-real-hash", username="Tester")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def client(db_session, test_user):
     def override_get_db():
         try:
             yield db_session
@@ -38,5 +55,31 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: test_user
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_current_user]
+
+@pytest.fixture
+def query_counter():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def auth_client(db_session, test_user):
+    # Goes through the real get_current_user with a bearer token for test_user
+    def override_get_db():
+        yield db_session
+
+    # test_user is recreated per test, so drop any record cached by an earlier one
+    user_cache.clear()
+    app.dependency_overrides[get_db] = override_get_db
+    token = auth.create_access_token(data={"sub": test_user.email})
+    yield TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    del app.dependency_overrides[get_db]
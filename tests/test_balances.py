@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from app import balances
+
+def _expense(client, amount, splits, paid_by=None):
+    response = client.post("/expenses/", json={
+        "title": "Trip",
+        "amount": amount,
+        "date": datetime(2026, 9, 1).isoformat(),
+        "category": "Fun",
+        "paid_by": paid_by,
+        "splits": [{"name": name, "initials": name[0], "amount": share} for name, share in splits]
+    })
+    assert response.status_code == 200
+
+def test_balances_and_settlement(client):
+    # You pay 90 split three ways, Ann pays 60 for Bob and Cat, Bob pays 10 for Ann
+    _expense(client, 90.0, [("You", None), ("Ann", None), ("Bob", None)])
+    _expense(client, 60.0, [("Bob", 30.0), ("Cat", 30.0)], paid_by="Ann")
+    _expense(client, 10.0, [("Ann", 10.0)], paid_by="Bob")
+
+    response = client.get("/balances")
+    assert response.status_code == 200
+    assert [(b["name"], b["balance"]) for b in response.json()] == [
+        ("You", 60.0), ("Ann", 20.0), ("Cat", -30.0), ("Bob", -50.0)
+    ]
+
+    transfers = client.get("/balances/settle").json()
+    assert transfers == [
+        {"debtor": "Bob", "creditor": "You", "amount": 50.0},
+        {"debtor": "Cat", "creditor": "Ann", "amount": 20.0},
+        {"debtor": "Cat", "creditor": "You", "amount": 10.0},
+    ]
+
+def test_settle_clears_every_balance_in_at_most_n_minus_one_transfers():
+    net = [("A", 12.34), ("B", 0.33), ("C", -7.0), ("D", -5.67), ("E", 0.0)]
+    transfers = balances.settle(net)
+    assert len(transfers) <= 3
+
+    remaining = dict(net)
+    for debtor, creditor, amount in transfers:
+        assert amount > 0
+        remaining[debtor] += amount
+        remaining[creditor] -= amount
+    assert all(abs(value) < 0.005 for value in remaining.values())
+
+def test_balances_ignore_other_users(client, db_session):
+    from app import models
+
+    other = models.User(email="stranger@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.flush()
+    db_session.add(models.Expense(user_id=other.id, title="Theirs", amount=100.0, category="Food", date=datetime(2026, 9, 2),
+                                  splits=[models.Split(name="Ann", initials="A", amount=100.0)]))
+    db_session.commit()
+
+    assert client.get("/balances").json() == []
+    assert client.get("/balances/settle").json() == []
@@ -0,0 +1,22 @@
+from app import blob_gc, models
+from app.blobstore import LocalBlobStore
+from app.images import thumbnail_ref
+
+def test_collect_deletes_only_unreferenced_blobs(db_session, test_user, tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    kept = store.put(b"%PDF-1.4 kept")
+    thumbnail = store.put(b"thumbnail", key=thumbnail_ref(kept))
+    orphan = store.put(b"%PDF-1.4 orphan")
+    db_session.add(models.Expense(user_id=test_user.id, title="Kept", amount=1.0, category="Food", receipt_ref=kept))
+    db_session.flush()
+
+    assert blob_gc.collect(db_session, store, grace_seconds=0, dry_run=True) == [orphan]
+    assert store.exists(orphan)
+
+    assert blob_gc.collect(db_session, store, grace_seconds=0) == [orphan]
+    assert not store.exists(orphan)
+    assert store.exists(kept) and store.exists(thumbnail)
+
+    # Fresh blobs may belong to a row that hasn't committed yet
+    store.put(b"%PDF-1.4 just uploaded")
+    assert blob_gc.collect(db_session, store) == []
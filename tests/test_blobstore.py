@@ -0,0 +1,20 @@
+import pytest
+
+from app.blobstore import LocalBlobStore, blob_key
+
+def test_local_store_is_content_addressed(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    key = store.put(b"receipt bytes")
+    assert key == blob_key(b"receipt bytes")
+    assert store.put(b"receipt bytes") == key
+    assert store.get(key) == b"receipt bytes"
+    assert store.size(key) == len(b"receipt bytes")
+    assert b"".join(store.iter_chunks(key, start=8, end=10, chunk_size=2)) == b"byt"
+
+    store.delete(key)
+    assert store.get(key) is None
+
+def test_local_store_rejects_path_like_keys(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.open("../../etc/passwd")
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app import crud, crud_async, models, schemas
+from app.blobstore import get_blob_store
+from app.models import Base
+
+def test_async_session_path(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/async.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        async with Session() as db:
+            db.add(models.User(email="async@example.com", hashed_password="x"))
+            await db.commit()
+
+            user = await crud_async.get_auth_user_by_email(db, email="async@example.com")
+            assert isinstance(user, schemas.AuthenticatedUser)
+
+            expense = await crud_async.create_expense(
+                db,
+                expense=schemas.ExpenseCreate(
+                    title="Async Dinner",
+                    amount=40.0,
+                    date=datetime(2026, 3, 1, 19, 30),
+                    category="Food",
+                    splits=[schemas.SplitCreate(name="Dana", initials="D", amount=20.0)],
+                ),
+                user_id=user.id,
+            )
+            # Relationships were loaded inside the session, not lazily afterwards
+            assert expense.splits[0].name == "Dana"
+
+            updated = await crud_async.update_user(db, user_id=user.id, user_update=schemas.UserUpdate(username="Async"))
+            assert updated.username == "Async"
+
+        await engine.dispose()
+
+    asyncio.run(run())
+
+def test_async_writes_keep_blob_io_off_the_event_loop(tmp_path, monkeypatch):
+    # Image ingest and the blob reads behind the response all belong in the
+    # threadpool, never under run_sync on the loop thread
+    io_threads = []
+    store = get_blob_store()
+    real_ingest, real_open = crud.ingest_image, store.open
+
+    def recording_ingest(data):
+        io_threads.append(threading.current_thread())
+        return real_ingest(data)
+
+    def recording_open(key):
+        io_threads.append(threading.current_thread())
+        return real_open(key)
+
+    monkeypatch.setattr(crud, "ingest_image", recording_ingest)
+    monkeypatch.setattr(store, "open", recording_open)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/async.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        async with Session() as db:
+            user = models.User(email="photos@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+
+            expense = schemas.ExpenseCreate(
+                title="Photographed",
+                amount=12.0,
+                date=datetime(2026, 3, 2, 12, 0),
+                category="Food",
+                receipt_data=b"%PDF-1.4 async receipt",
+                items=[schemas.ExpenseItemCreate(name="Soup", price=12.0, image_data=b"GIF89a soup")],
+            )
+            created = await crud_async.create_expense(db, expense=expense, user_id=user.id)
+            assert created.receipt_data == b"%PDF-1.4 async receipt"
+            assert created.items[0].image_data == b"GIF89a soup"
+
+            results = await crud_async.create_expenses_batch(db, expenses=[expense], user_id=user.id)
+            assert results[0]["status"] == "created"
+
+            updated = await crud_async.update_user(
+                db, user_id=user.id, user_update=schemas.UserUpdate(profile_image_data=b"GIF89a avatar")
+            )
+            assert updated.profile_image_data == b"GIF89a avatar"
+
+        await engine.dispose()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert len(io_threads) >= 7
+    assert loop_thread not in io_threads
@@ -0,0 +1,141 @@
+import asyncio
+import base64
+from email.message import EmailMessage
+
+from fastapi_mail import ConnectionConfig
+
+from app import email as app_email
+from app.email import SMTPConnectionPool
+
+class StandInSMTPServer:
+    # Just enough SMTP to accept mail, so the tests can count connections
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        self.writers = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(b"220 stand-in ESMTP\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    writer.write(b"250 stand-in\r\n")
+                elif command == "DATA":
+                    writer.write(b"354 go ahead\r\n")
+                    await writer.drain()
+                    data = b""
+                    while not data.endswith(b"\r\n.\r\n"):
+                        data += await reader.readline()
+                    self.messages.append(data)
+                    writer.write(b"250 queued\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def _config(port):
+    return ConnectionConfig(
+        MAIL_USERNAME="sender",
+        MAIL_PASSWORD="unused",
+        MAIL_FROM="sender@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+    )
+
+def _message(n):
+    message = EmailMessage()
+    message["From"] = "sender@example.com"
+    message["To"] = f"friend{n}@example.com"
+    message["Subject"] = f"Receipt {n}"
+    message.set_content("hello")
+    return message
+
+def test_pool_reuses_connections():
+    async def run():
+        server = StandInSMTPServer()
+        pool = SMTPConnectionPool(_config(await server.start()), size=1)
+        try:
+            for n in range(6):
+                await pool.send(_message(n))
+        finally:
+            await pool.close()
+            await server.stop()
+        return server, pool
+
+    server, pool = asyncio.run(run())
+    assert len(server.messages) == 6
+    assert server.connections == 1
+    assert pool.connections_opened == 1
+
+def test_pool_reconnects_after_server_drop():
+    async def run():
+        server = StandInSMTPServer()
+        pool = SMTPConnectionPool(_config(await server.start()), size=1)
+        try:
+            await pool.send(_message(1))
+            server.drop_connections()
+            await asyncio.sleep(0.05)
+            await pool.send(_message(2))
+        finally:
+            await pool.close()
+            await server.stop()
+        return server, pool
+
+    server, pool = asyncio.run(run())
+    assert len(server.messages) == 2
+    assert pool.connections_opened == 2
+
+def test_receipt_email_attaches_from_memory(monkeypatch):
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+
+    async def run():
+        server = StandInSMTPServer()
+        pool = SMTPConnectionPool(_config(await server.start()), size=1)
+        monkeypatch.setattr(app_email, "get_mail_pool", lambda: pool)
+        try:
+            await app_email.send_receipt_email(
+                "friend@example.com",
+                {"title": "Dinner", "amount": "12.00", "date": "2026-05-04 19:00", "category": "Food", "id": "x"},
+                png,
+            )
+        finally:
+            await pool.close()
+            await server.stop()
+        return server
+
+    server = asyncio.run(run())
+    raw = server.messages[0].decode()
+    assert "Content-Type: image/png" in raw
+    assert "receipt.png" in raw
+    assert base64.b64encode(png).decode() in raw.replace("\r\n", "")
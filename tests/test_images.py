@@ -0,0 +1,93 @@
+import base64
+import io
+from datetime import datetime
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app import images, models
+
+def _jpeg(width, height):
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(out, format="JPEG")
+    return out.getvalue()
+
+def test_normalize_bounds_resolution():
+    normalized = images.normalize_image(_jpeg(images.IMAGE_MAX_DIMENSION * 2, 100))
+    assert max(Image.open(io.BytesIO(normalized)).size) == images.IMAGE_MAX_DIMENSION
+
+def test_normalize_keeps_small_images_and_non_images():
+    small = _jpeg(64, 64)
+    assert images.normalize_image(small) == small
+    assert images.normalize_image(b"%PDF-1.4 not an image") == b"%PDF-1.4 not an image"
+
+def test_base64_uploads_are_stored_decoded():
+    small = _jpeg(64, 64)
+    assert images.normalize_image(base64.b64encode(small)) == small
+    payload = base64.b64encode(_jpeg(images.IMAGE_MAX_DIMENSION + 500, 50))
+    normalized = images.normalize_image(payload)
+    assert max(Image.open(io.BytesIO(normalized)).size) == images.IMAGE_MAX_DIMENSION
+
+def test_receipt_thumbnail_endpoint(client):
+    response = client.post(
+        "/expenses/",
+        json={
+            "title": "Photographed",
+            "amount": 18.0,
+            "date": datetime.now().isoformat(),
+            "category": "Food",
+            "receipt_data": base64.b64encode(_jpeg(1200, 1600)).decode()
+        },
+    )
+    expense_id = response.json()["id"]
+
+    thumbnail = client.get(f"/expenses/{expense_id}/receipt/thumbnail")
+    assert thumbnail.status_code == 200
+    assert thumbnail.headers["content-type"] == "image/jpeg"
+    assert max(Image.open(io.BytesIO(thumbnail.content)).size) == images.THUMBNAIL_SIZE
+
+def test_expense_response_keeps_base64_image_fields(client, db_session):
+    jpeg = _jpeg(64, 64)
+    payload = base64.b64encode(jpeg).decode()
+    response = client.post(
+        "/expenses/",
+        json={
+            "title": "Echoed",
+            "amount": 4.0,
+            "date": datetime.now().isoformat(),
+            "category": "Food",
+            "receipt_data": payload,
+            "items": [{"name": "Tea", "price": 4.0, "image_data": payload}]
+        },
+    )
+    expense = client.get(f"/expenses/{response.json()['id']}").json()
+    assert expense["receipt_data"] == payload
+    assert expense["items"][0]["image_data"] == payload
+
+    db_expense = db_session.get(models.Expense, expense["id"])
+    assert db_expense.receipt_data == jpeg
+
+def test_base64_jpeg_downloads_as_the_image(client):
+    jpeg = _jpeg(64, 64)
+    response = client.post(
+        "/expenses/",
+        json={
+            "title": "Downloaded",
+            "amount": 6.0,
+            "date": datetime.now().isoformat(),
+            "category": "Food",
+            "receipt_data": base64.b64encode(jpeg).decode()
+        },
+    )
+    url = f"/expenses/{response.json()['id']}/receipt"
+
+    full = client.get(url)
+    assert full.headers["content-type"] == "image/jpeg"
+    assert full.content == jpeg
+    assert full.headers["content-length"] == str(len(jpeg))
+
+    partial = client.get(url, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == jpeg[:10]
+    assert partial.headers["content-range"] == f"bytes 0-9/{len(jpeg)}"
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, ForeignKey, Index, MetaData, String, Table
+
+from app import index_audit
+from app.models import Base
+
+def test_models_have_no_unindexed_foreign_keys_or_filters():
+    assert index_audit.audit(Base.metadata, index_audit.metadata_indexes(Base.metadata)) == []
+
+def test_test_database_matches_the_audit(db_session):
+    indexes = index_audit.database_indexes(db_session.connection())
+    assert index_audit.audit(Base.metadata, indexes) == []
+
+def test_audit_flags_uncovered_paths_and_accepts_prefixes():
+    metadata = MetaData()
+    Table("owners", metadata, Column("id", String, primary_key=True))
+    Table(
+        "pets", metadata,
+        Column("id", String, primary_key=True),
+        Column("owner_id", String, ForeignKey("owners.id")),
+        Column("vet_id", String, ForeignKey("owners.id")),
+        Column("name", String),
+        Index("ix_pets_owner_id_name", "owner_id", "name"),
+    )
+    indexes = index_audit.metadata_indexes(metadata)
+
+    missing = index_audit.audit(metadata, indexes, access_paths=[("pets", ("owner_id", "name")), ("pets", ("name",))])
+    assert missing == [("pets", ("vet_id",), "foreign key"), ("pets", ("name",), "filter")]
+
+def test_audit_reports_missing_tables_once():
+    metadata = MetaData()
+    Table("owners", metadata, Column("id", String, primary_key=True))
+    Table("pets", metadata, Column("id", String, primary_key=True), Column("owner_id", String, ForeignKey("owners.id")))
+    indexes = {"pets": [("id",), ("owner_id",)]}
+
+    missing = index_audit.audit(metadata, indexes, access_paths=[("owners", ("id",)), ("vets", ("name",))])
+    assert missing == [("owners", (), index_audit.MISSING_TABLE), ("vets", (), index_audit.MISSING_TABLE)]
@@ -84,3 +84,434 @@ def test_delete_expense(client):
     # Verify it's gone
     get_response = client.get(f"/expenses/{expense_id}")
     assert get_response.status_code == 404
+
+def test_list_expenses_omits_receipt_bytes(client):
+    create_response = client.post(
+        "/expenses/",
+        json={
+            "title": "With Receipt",
+            "amount": 12.5,
+            "date": datetime.now().isoformat(),
+            "category": "Food",
+            "receipt_data": "%PDF-1.4 receipt",
+            "items": [{"name": "Coffee", "price": 4.5, "image_data": "%PDF-1.4 item"}]
+        },
+    )
+    expense_id = create_response.json()["id"]
+    item_id = create_response.json()["items"][0]["id"]
+
+    response = client.get("/expenses/")
+    assert response.status_code == 200
+    listed = next(e for e in response.json() if e["id"] == expense_id)
+    assert listed["has_receipt"] is True
+    assert "receipt_data" not in listed
+    assert listed["items"][0]["has_image"] is True
+    assert "image_data" not in listed["items"][0]
+
+    receipt = client.get(f"/expenses/{expense_id}/receipt")
+    assert receipt.status_code == 200
+    assert receipt.content == b"%PDF-1.4 receipt"
+    assert receipt.headers["content-type"] == "application/pdf"
+
+    image = client.get(f"/expenses/{expense_id}/items/{item_id}/image")
+    assert image.status_code == 200
+    assert image.content == b"%PDF-1.4 item"
+
+def test_receipt_missing_returns_404(client):
+    create_response = client.post(
+        "/expenses/",
+        json={
+            "title": "No Receipt",
+            "amount": 3.0,
+            "date": datetime.now().isoformat(),
+            "category": "Transport"
+        },
+    )
+    expense_id = create_response.json()["id"]
+    assert client.get(f"/expenses/{expense_id}/receipt").status_code == 404
+
+def test_list_expenses_query_count_is_constant(client, query_counter):
+    for i in range(5):
+        client.post(
+            "/expenses/",
+            json={
+                "title": f"Trip {i}",
+                "amount": 30.0,
+                "date": datetime.now().isoformat(),
+                "category": "Fun",
+                "splits": [
+                    {"name": "A", "initials": "A", "amount": 15.0},
+                    {"name": "B", "initials": "B", "amount": 15.0}
+                ],
+                "items": [
+                    {"name": "Ticket", "price": 10.0},
+                    {"name": "Snack", "price": 5.0, "quantity": 4}
+                ]
+            },
+        )
+
+    query_counter.clear()
+    response = client.get("/expenses/")
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    # One SELECT for the page plus one per eagerly loaded collection (the
+    # current-user lookup is not part of the page)
+    selects = [s for s in query_counter if s.lstrip().startswith("SELECT") and "FROM users" not in s]
+    assert len(selects) == 3
+
+def test_expenses_cursor_pagination(client):
+    for day in range(1, 6):
+        client.post(
+            "/expenses/",
+            json={
+                "title": f"Day {day}",
+                "amount": float(day),
+                "date": datetime(2026, 1, day, 12, 0).isoformat(),
+                "category": "Food"
+            },
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/expenses/", params=params)
+        assert response.status_code == 200
+        seen += [e["title"] for e in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ["Day 5", "Day 4", "Day 3", "Day 2", "Day 1"]
+
+def test_friends_cursor_pagination(client):
+    for name in ["Carol", "Alice", "Bob"]:
+        client.post(
+            "/friends/",
+            json={"name": name, "initials": name[0], "gradient_start": "#000", "gradient_end": "#fff"},
+        )
+
+    first = client.get("/friends/", params={"limit": 2})
+    assert [f["name"] for f in first.json()] == ["Alice", "Bob"]
+    second = client.get("/friends/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [f["name"] for f in second.json()] == ["Carol"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/saved-items/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_current_user_is_cached_and_invalidated(auth_client, db_session, test_user, monkeypatch):
+    from app.cache import user_cache
+    from app import crud, main
+
+    assert auth_client.get("/users/me").status_code == 200
+    assert auth_client.get("/users/me").status_code == 200
+    assert auth_client.get("/cache-stats").status_code == 404
+    monkeypatch.setattr(main, "DIAGNOSTICS_ENABLED", True)
+    stats = auth_client.get("/cache-stats").json()["user_cache"]
+    # The stats requests authenticate too, from the cache
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+
+    response = auth_client.put("/users/me", json={"username": "Renamed"})
+    assert response.json()["username"] == "Renamed"
+    assert user_cache.get(test_user.email) is None
+
+    crud.deactivate_user(db_session, user_id=test_user.id)
+    assert auth_client.get("/users/me").status_code == 401
+
+def test_register_and_login_use_hash_pool(client):
+    response = client.post("/register", json={"email": "login@example.com", "password": "s3cret-pass"})
+    assert response.status_code == 200
+
+    ok = client.post("/token", data={"username": "login@example.com", "password": "s3cret-pass"})
+    assert ok.status_code == 200
+    assert "access_token" in ok.json()
+
+    bad = client.post("/token", data={"username": "login@example.com", "password": "wrong"})
+    assert bad.status_code == 401
+
+def test_db_pool_stats(client, monkeypatch):
+    from sqlalchemy import create_engine, text
+    from app.database import InstrumentedQueuePool
+    from app import main
+
+    pooled = create_engine("sqlite:///./test.db", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0)
+    with pooled.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert pooled.pool.stats()["checked_out"] == 1
+    stats = pooled.pool.stats()
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    pooled.dispose()
+
+    # Off unless DIAGNOSTICS_ENABLED is set
+    assert client.get("/db-pool").status_code == 404
+    monkeypatch.setattr(main, "DIAGNOSTICS_ENABLED", True)
+    response = client.get("/db-pool")
+    assert response.status_code == 200
+    assert set(response.json()) == {"settings", "sync", "async"}
+
+def test_profile_image_is_stored_outside_the_row(client, db_session, test_user):
+    response = client.put("/users/me", json={"profile_image_data": "GIF89a avatar"})
+    assert response.status_code == 200
+
+    db_session.refresh(test_user)
+    assert test_user.profile_image_ref is not None
+
+    image = client.get("/users/me/profile-image")
+    assert image.status_code == 200
+    assert image.content == b"GIF89a avatar"
+    assert image.headers["content-type"] == "image/gif"
+
+def test_receipt_download_supports_etag_and_range(client):
+    create_response = client.post(
+        "/expenses/",
+        json={
+            "title": "Ranged",
+            "amount": 9.0,
+            "date": datetime.now().isoformat(),
+            "category": "Food",
+            "receipt_data": "%PDF-0123456789"
+        },
+    )
+    url = f"/expenses/{create_response.json()['id']}/receipt"
+
+    full = client.get(url)
+    etag = full.headers["etag"]
+    assert full.headers["accept-ranges"] == "bytes"
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    partial = client.get(url, headers={"Range": "bytes=5-8"})
+    assert partial.status_code == 206
+    assert partial.content == b"0123"
+    assert partial.headers["content-range"] == "bytes 5-8/15"
+
+    suffix = client.get(url, headers={"Range": "bytes=-3"})
+    assert suffix.content == b"789"
+
+    stale = client.get(url, headers={"Range": "bytes=0-3", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == b"%PDF-0123456789"
+
+    unsatisfiable = client.get(url, headers={"Range": "bytes=100-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */15"
+
+def test_batch_create_uses_one_insert_per_table(client, query_counter):
+    payload = {
+        "expenses": [
+            {
+                "title": f"Queued {i}",
+                "amount": 10.0 + i,
+                "date": datetime(2026, 2, 1 + i, 9, 0).isoformat(),
+                "category": "Transport",
+                "splits": [{"name": "A", "initials": "A", "amount": 5.0}],
+                "items": [{"name": "Fare", "price": 10.0}]
+            }
+            for i in range(3)
+        ]
+    }
+
+    query_counter.clear()
+    response = client.post("/expenses/batch", json=payload)
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == ["created"] * 3
+    assert [r["index"] for r in results] == [0, 1, 2]
+    inserts = [s.split()[2] for s in query_counter if s.lstrip().startswith("INSERT")]
+    assert sorted(inserts) == ["expense_items", "expense_rollups", "expenses", "splits"]
+
+    created = client.get(f"/expenses/{results[1]['id']}").json()
+    assert created["title"] == "Queued 1"
+    assert created["splits"][0]["name"] == "A"
+    assert created["items"][0]["name"] == "Fare"
+
+def test_batch_create_rejects_empty_batch(client):
+    assert client.post("/expenses/batch", json={"expenses": []}).status_code == 422
+
+def test_create_expense_writes_once_without_reloading(client, query_counter):
+    query_counter.clear()
+    response = client.post("/expenses/", json={
+        "title": "Groceries",
+        "amount": 42.0,
+        "date": datetime(2026, 3, 1, 18, 0).isoformat(),
+        "category": "Food",
+        "splits": [{"name": "A", "initials": "A", "amount": 21.0}, {"name": "B", "initials": "B", "amount": 21.0}],
+        "items": [{"name": "Milk", "price": 2.0}]
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["splits"]) == 2
+    assert data["items"][0]["expense_id"] == data["id"]
+    assert data["has_receipt"] is False
+
+    # Parent and children are inserted in one flush; nothing is read back
+    statements = [s for s in query_counter if "FROM users" not in s]
+    assert all(s.lstrip().startswith("INSERT") for s in statements)
+
+def test_update_expense_applies_minimal_child_diff(client, query_counter, monkeypatch):
+    from app import crud
+
+    created = client.post("/expenses/", json={
+        "title": "Market",
+        "amount": 20.0,
+        "date": datetime(2026, 3, 2, 10, 0).isoformat(),
+        "category": "Food",
+        "splits": [{"name": "A", "initials": "A", "amount": 10.0}, {"name": "B", "initials": "B", "amount": 10.0}],
+        "items": [{"name": "Cheese", "price": 8.0, "image_data": "%PDF-1.4 cheese"}, {"name": "Bread", "price": 3.0}]
+    }).json()
+    split_a, split_b = created["splits"]
+    cheese, bread = created["items"]
+
+    ingested = []
+    monkeypatch.setattr(crud, "ingest_image", lambda data: ingested.append(data))
+    query_counter.clear()
+    response = client.put(f"/expenses/{created['id']}", json={
+        "splits": [{"id": split_a["id"], "name": "A", "initials": "A", "amount": 12.0}, {"name": "C", "initials": "C", "amount": 8.0}],
+        "items": [
+            {"id": cheese["id"], "name": "Cheese", "price": 8.0, "quantity": 2},
+            {"id": bread["id"], "name": "Bread", "price": 3.0, "image_data": bread["image_data"]}
+        ]
+    })
+    assert response.status_code == 200
+    data = response.json()
+
+    assert ingested == []
+    assert {s["id"] for s in data["splits"]} >= {split_a["id"]}
+    assert split_b["id"] not in {s["id"] for s in data["splits"]}
+    assert sorted(s["name"] for s in data["splits"]) == ["A", "C"]
+    items = {i["id"]: i for i in data["items"]}
+    assert items[cheese["id"]]["quantity"] == 2
+    assert items[cheese["id"]]["image_data"] == cheese["image_data"]
+
+    writes = [s for s in query_counter if s.lstrip().split()[0] in ("INSERT", "UPDATE", "DELETE")]
+    assert not any("expense_items" in s and not s.startswith("UPDATE expense_items SET quantity") for s in writes)
+    assert not any("image_ref" in s for s in writes)
+
+def test_sync_returns_only_changes_since_token(client):
+    from app import crud
+
+    kept = client.post("/expenses/", json={"title": "Old", "amount": 1.0, "date": datetime(2026, 1, 1).isoformat(), "category": "Food"}).json()
+    doomed = client.post("/saved-items/", json={"name": "Tea", "default_price": 2.0}).json()
+
+    full = client.get("/sync")
+    assert full.status_code == 200
+    assert kept["id"] in [e["id"] for e in full.json()["expenses"]]
+    assert doomed["id"] in [i["id"] for i in full.json()["saved_items"]]
+    token = full.json()["next_token"]
+
+    # Without the lookback everything above predates the token
+    original_lookback = crud.SYNC_LOOKBACK_SECONDS
+    crud.SYNC_LOOKBACK_SECONDS = 0
+    try:
+        assert client.get("/sync", params={"since": token}).json()["expenses"] == []
+
+        friend = client.post("/friends/", json={"name": "Zoe", "initials": "Z", "gradient_start": "#000", "gradient_end": "#fff"}).json()
+        client.put(f"/expenses/{kept['id']}", json={"items": [{"name": "Tea", "price": 1.0}]})
+        client.delete(f"/saved-items/{doomed['id']}")
+
+        delta = client.get("/sync", params={"since": token}).json()
+    finally:
+        crud.SYNC_LOOKBACK_SECONDS = original_lookback
+
+    assert [e["id"] for e in delta["expenses"]] == [kept["id"]]
+    assert delta["expenses"][0]["items"][0]["name"] == "Tea"
+    assert [f["id"] for f in delta["friends"]] == [friend["id"]]
+    assert delta["saved_items"] == []
+    assert delta["deleted"]["saved_items"] == [doomed["id"]]
+
+def test_sync_rejects_malformed_token(client):
+    assert client.get("/sync", params={"since": "not-a-token"}).status_code == 400
+
+def _create_summary_fixtures(client):
+    for title, amount, date, category, splits in [
+        ("Hotel", 300.0, datetime(2026, 4, 6, 12), "Lodging", [{"name": "Ann", "initials": "A", "amount": 200.0}, {"name": "Bob", "initials": "B", "amount": 100.0}]),
+        ("Lunch", 30.0, datetime(2026, 4, 8, 13), "Food", [{"name": "Ann", "initials": "A"}, {"name": "Bob", "initials": "B"}]),
+        ("Dinner", 50.0, datetime(2026, 4, 13, 20), "Food", []),
+        ("Taxi", 20.0, datetime(2026, 5, 1, 9), "Transport", [{"name": "Bob", "initials": "B", "amount": 20.0}]),
+    ]:
+        client.post("/expenses/", json={"title": title, "amount": amount, "date": date.isoformat(), "category": category, "splits": splits})
+
+def test_expense_summary_groupings(client):
+    _create_summary_fixtures(client)
+
+    def summary(**params):
+        response = client.get("/expenses/summary", params=params)
+        assert response.status_code == 200
+        return {b["key"]: (b["total"], b["count"]) for b in response.json()}
+
+    assert summary() == {"Food": (80.0, 2), "Lodging": (300.0, 1), "Transport": (20.0, 1)}
+    assert summary(group_by="month") == {"2026-04": (380.0, 3), "2026-05": (20.0, 1)}
+    assert summary(group_by="week") == {"2026-04-06": (330.0, 2), "2026-04-13": (50.0, 1), "2026-04-27": (20.0, 1)}
+    assert summary(group_by="day")["2026-04-08"] == (30.0, 1)
+    assert summary(group_by="participant") == {"Ann": (215.0, 2), "Bob": (135.0, 3)}
+    assert summary(group_by="month", start="2026-05-01T00:00:00") == {"2026-05": (20.0, 1)}
+    assert client.get("/expenses/summary", params={"group_by": "year"}).status_code == 422
+
+def _create_filter_fixtures(client):
+    for title, amount, date, category, splits in [
+        ("Hostel", 80.0, datetime(2026, 8, 1), "Lodging", ["Ann"]),
+        ("Ramen", 25.0, datetime(2026, 8, 2), "Food", ["Ann", "Bob"]),
+        ("Ferry", 40.0, datetime(2026, 8, 3), "Transport", ["Bob"]),
+        ("Tapas", 60.0, datetime(2026, 8, 4), "Food", ["Bob"]),
+    ]:
+        client.post("/expenses/", json={
+            "title": title, "amount": amount, "date": date.isoformat(), "category": category,
+            "splits": [{"name": name, "initials": name[0]} for name in splits]
+        })
+
+def test_read_expenses_filters_and_sorts(client):
+    _create_filter_fixtures(client)
+
+    def titles(**params):
+        response = client.get("/expenses/", params=params)
+        assert response.status_code == 200
+        return [e["title"] for e in response.json()]
+
+    assert titles() == ["Tapas", "Ferry", "Ramen", "Hostel"]
+    assert titles(category="Food") == ["Tapas", "Ramen"]
+    assert titles(start="2026-08-02T00:00:00", end="2026-08-04T00:00:00") == ["Ferry", "Ramen"]
+    assert titles(min_amount=30, max_amount=70) == ["Tapas", "Ferry"]
+    assert titles(participant="Ann") == ["Ramen", "Hostel"]
+    assert titles(sort="amount") == ["Hostel", "Tapas", "Ferry", "Ramen"]
+    assert titles(sort="amount", participant="Bob", category="Food") == ["Tapas", "Ramen"]
+    assert client.get("/expenses/", params={"sort": "title"}).status_code == 422
+
+def test_read_expenses_paginates_by_amount(client):
+    _create_filter_fixtures(client)
+
+    first = client.get("/expenses/", params={"sort": "amount", "limit": 2})
+    assert [e["title"] for e in first.json()] == ["Hostel", "Tapas"]
+    second = client.get("/expenses/", params={"sort": "amount", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [e["title"] for e in second.json()] == ["Ferry", "Ramen"]
+
+def _query_plan(db_session, query):
+    from sqlalchemy import text
+
+    connection = db_session.connection()
+    sql = str(query.statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        # Tiny test tables would otherwise always be scanned sequentially
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        return "\n".join(row[0] for row in connection.execute(text(f"EXPLAIN {sql}")))
+    return "\n".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+def test_expense_filters_use_composite_indexes(db_session, test_user):
+    from app import crud, schemas
+
+    def plan(sort="date", **filters):
+        query = crud.expenses_query(db_session, test_user.id, filters=schemas.ExpenseFilters(**filters), sort=sort)
+        return _query_plan(db_session, query)
+
+    assert "ix_expenses_user_id_date_id" in plan(start=datetime(2026, 1, 1))
+    assert "ix_expenses_user_id_category_date_id" in plan(category="Food")
+    assert "ix_expenses_user_id_amount_id" in plan(sort="amount", min_amount=10)
+    participant_plan = plan(participant="Ann")
+    assert "ix_splits_expense_id_name" in participant_plan
+    assert "SCAN expenses\n" not in participant_plan + "\n"
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+
+from app.models import Base
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def test_autogenerate_sees_no_drift(tmp_path):
+    # The models plus the search index (created by DDL events) must read as
+    # up to date, or the next autogenerated revision would drop the index
+    url = f"sqlite:///{tmp_path}/check.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.stamp(config, "head")
+    command.check(config)
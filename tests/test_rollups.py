@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from app import models, rollups
+
+def _rollup_rows(db_session, user_id):
+    rows = db_session.query(models.ExpenseRollup).filter(models.ExpenseRollup.user_id == user_id, models.ExpenseRollup.count != 0)
+    return {(r.month, r.category): (round(r.total, 6), r.count) for r in rows}
+
+def _create(client, title, amount, date, category):
+    response = client.post("/expenses/", json={"title": title, "amount": amount, "date": date.isoformat(), "category": category})
+    assert response.status_code == 200
+    return response.json()
+
+def test_rollups_track_creates_updates_and_deletes(client, db_session, test_user):
+    hotel = _create(client, "Hotel", 300.0, datetime(2026, 4, 6), "Lodging")
+    lunch = _create(client, "Lunch", 30.0, datetime(2026, 4, 8), "Food")
+    _create(client, "Dinner", 50.0, datetime(2026, 5, 13), "Food")
+    client.post("/expenses/batch", json={"expenses": [
+        {"title": "Taxi", "amount": 20.0, "date": datetime(2026, 5, 1).isoformat(), "category": "Transport"},
+        {"title": "Bus", "amount": 5.0, "date": datetime(2026, 5, 2).isoformat(), "category": "Transport"},
+    ]})
+    client.put(f"/expenses/{lunch['id']}", json={"amount": 35.0, "date": datetime(2026, 5, 9).isoformat()})
+    client.delete(f"/expenses/{hotel['id']}")
+
+    incremental = _rollup_rows(db_session, test_user.id)
+    assert incremental == {
+        ("2026-05", "Food"): (85.0, 2),
+        ("2026-05", "Transport"): (25.0, 2),
+    }
+
+    rollups.rebuild(db_session, user_id=test_user.id)
+    assert _rollup_rows(db_session, test_user.id) == incremental
+
+def test_summary_reads_rollups_for_whole_months(client, db_session, test_user, query_counter):
+    _create(client, "Lunch", 30.0, datetime(2026, 4, 8), "Food")
+    _create(client, "Taxi", 20.0, datetime(2026, 5, 1, 9), "Transport")
+
+    query_counter.clear()
+    response = client.get("/expenses/summary", params={"group_by": "month", "start": "2026-05-01T00:00:00"})
+    assert response.json() == [{"key": "2026-05", "total": 20.0, "count": 1}]
+    assert any("expense_rollups" in s for s in query_counter)
+    assert not any("FROM expenses" in s for s in query_counter)
+
+    # A bound inside a month needs the expenses themselves
+    query_counter.clear()
+    response = client.get("/expenses/summary", params={"group_by": "category", "start": "2026-04-08T12:00:00"})
+    assert response.json() == [{"key": "Transport", "total": 20.0, "count": 1}]
+    assert any("FROM expenses" in s for s in query_counter)
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from app import models, search
+
+def _create_expense(client, title, items=()):
+    response = client.post("/expenses/", json={
+        "title": title,
+        "amount": 10.0,
+        "date": datetime(2026, 6, 1).isoformat(),
+        "category": "Food",
+        "items": [{"name": name, "price": 1.0} for name in items]
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_search_covers_titles_items_and_saved_items(client):
+    dinner = _create_expense(client, "Pizza night", items=["Margherita", "Tiramisu"])
+    _create_expense(client, "Groceries", items=["Pizza dough"])
+    client.post("/saved-items/", json={"name": "Pizza cutter", "default_price": 8.0})
+
+    response = client.get("/search", params={"q": "piz"})
+    assert response.status_code == 200
+    results = response.json()
+    assert sorted(r["kind"] for r in results) == ["expense", "expense_item", "saved_item"]
+    assert all(r["text"].startswith("Pizza") for r in results)
+
+    response = client.get("/search", params={"q": "tira"})
+    assert [(r["kind"], r["expense_id"]) for r in response.json()] == [("expense_item", dinner["id"])]
+
+    # Every term has to match
+    assert [r["text"] for r in client.get("/search", params={"q": "pizza dou"}).json()] == ["Pizza dough"]
+    assert client.get("/search", params={"q": "  ?! "}).json() == []
+
+def test_search_index_follows_updates_and_deletes(client):
+    expense = _create_expense(client, "Museum tickets")
+    client.put(f"/expenses/{expense['id']}", json={"title": "Gallery tickets"})
+    assert client.get("/search", params={"q": "museum"}).json() == []
+    assert [r["id"] for r in client.get("/search", params={"q": "gallery"}).json()] == [expense["id"]]
+
+    client.delete(f"/expenses/{expense['id']}")
+    assert client.get("/search", params={"q": "tickets"}).json() == []
+
+def test_search_is_scoped_to_user_and_paginated(client, db_session):
+    other = models.User(email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.add(models.SavedItem(user_id=other.id, name="Coffee beans"))
+    db_session.commit()
+    for i in range(3):
+        client.post("/saved-items/", json={"name": f"Coffee {i}", "default_price": 1.0})
+
+    first = client.get("/search", params={"q": "coffee", "limit": 2})
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/search", params={"q": "coffee", "limit": 2, "cursor": cursor})
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    names = {r["text"] for r in first.json() + second.json()}
+    assert names == {"Coffee 0", "Coffee 1", "Coffee 2"}
+
+def test_install_backfills_existing_rows(db_session, test_user):
+    connection = db_session.connection()
+    search.drop_sqlite_index(connection)
+    db_session.add(models.SavedItem(user_id=test_user.id, name="Backfilled kettle"))
+    db_session.flush()
+    search.install_sqlite_index(connection)
+
+    assert [row[3] for row in search.search(db_session, test_user.id, "kettle")] == ["Backfilled kettle"]
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from app import suggest
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    # Each test's rows are rolled back, so don't let indexes outlive them
+    suggest.suggest_indexes.clear()
+    yield
+    suggest.suggest_indexes.clear()
+
+def test_prefix_index_ranks_by_usage_then_name():
+    index = suggest.PrefixIndex(
+        [("1", "Milk", 1.0), ("2", "Mint tea", 3.0), ("3", "mango", 2.0), ("4", "Bread", 2.5)],
+        {"mint tea": 4, "mango": 1}
+    )
+    assert [s[1] for s in index.suggest("M")] == ["Mint tea", "mango", "Milk"]
+    assert [s[1] for s in index.suggest("mi", limit=1)] == ["Mint tea"]
+    assert index.suggest("x") == []
+
+    index.add("1", "Oat milk", 1.5)
+    index.remove("2")
+    assert [s[1] for s in index.suggest("m")] == ["mango"]
+    assert index.suggest("oat") == [("1", "Oat milk", 1.5, 0)]
+
+def test_suggest_endpoint_follows_saved_item_writes(client):
+    for name in ("Coffee", "Cola", "Cake"):
+        client.post("/saved-items/", json={"name": name, "default_price": 2.0})
+    client.post("/expenses/", json={
+        "title": "Cafe",
+        "amount": 6.0,
+        "date": datetime(2026, 7, 1).isoformat(),
+        "category": "Food",
+        "items": [{"name": "cola", "price": 2.0}, {"name": "Cola", "price": 2.0}, {"name": "Cake", "price": 2.0}]
+    })
+
+    response = client.get("/saved-items/suggest", params={"prefix": "c"})
+    assert response.status_code == 200
+    assert [(s["name"], s["uses"]) for s in response.json()] == [("Cola", 2), ("Cake", 1), ("Coffee", 0)]
+
+    # Writes patch the loaded index instead of rebuilding it
+    created = client.post("/saved-items/", json={"name": "Cocoa", "default_price": 3.0}).json()
+    cola = next(s for s in response.json() if s["name"] == "Cola")
+    client.put(f"/saved-items/{cola['id']}", json={"name": "Lemonade", "default_price": 2.0})
+    client.post("/expenses/", json={
+        "title": "Cafe again",
+        "amount": 3.0,
+        "date": datetime(2026, 7, 2).isoformat(),
+        "category": "Food",
+        "items": [{"name": "Cocoa", "price": 3.0}]
+    })
+    assert [s["name"] for s in client.get("/saved-items/suggest", params={"prefix": "co"}).json()] == ["Cocoa", "Coffee"]
+    assert client.get("/saved-items/suggest", params={"prefix": "lem"}).json()[0]["id"] == cola["id"]
+
+    client.delete(f"/saved-items/{created['id']}")
+    assert [s["name"] for s in client.get("/saved-items/suggest", params={"prefix": "co"}).json()] == ["Coffee"]
+    assert suggest.suggest_indexes.stats()["misses"] == 1
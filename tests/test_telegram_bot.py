@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from app.telegram_bot import TelegramClient, TokenBucket
+
+class MockBotAPI:
+    # Minimal keep-alive HTTP/1.1 server standing in for api.telegram.org
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.connections = 0
+        self.requests = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {k.lower(): v for k, v in (line.split(": ", 1) for line in header_lines if ": " in line)}
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests.append((request_line.split()[1], body))
+
+                status, payload = self.responses.pop(0) if self.responses else (200, {"ok": True})
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\ncontent-type: application/json\r\ncontent-length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def test_client_reuses_connection_and_honours_retry_after():
+    async def run():
+        api = MockBotAPI([(429, {"ok": False, "parameters": {"retry_after": 0.2}})])
+        client = TelegramClient("TOKEN", base_url=await api.start(), rate=100, burst=10)
+        try:
+            started = time.monotonic()
+            first = await client.send_message("42", "hello")
+            elapsed = time.monotonic() - started
+            second = await client.send_photo("42", b"\xff\xd8\xff\xe0jpeg", caption="receipt")
+        finally:
+            await client.aclose()
+            await api.stop()
+        return api, first, second, elapsed
+
+    api, first, second, elapsed = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert elapsed >= 0.2
+    assert [path for path, _ in api.requests] == ["/botTOKEN/sendMessage", "/botTOKEN/sendMessage", "/botTOKEN/sendPhoto"]
+    assert b"image/jpeg" in api.requests[2][1]
+    assert api.connections == 1
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens are available immediately, the other two take 1/20s each
+    assert asyncio.run(run()) >= 0.09
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import email as app_email, models, worker
+
+def _create_expense_with_email(client):
+    response = client.post(
+        "/expenses/",
+        json={
+            "title": "Team Lunch",
+            "amount": 42.0,
+            "date": datetime(2026, 5, 4, 12, 30).isoformat(),
+            "category": "Food",
+            "recipient_email": "friend@example.com",
+            "receipt_data": "%PDF-1.4 lunch"
+        },
+    )
+    assert response.status_code == 200
+
+def _outbox(db_session):
+    return db_session.query(models.NotificationOutbox).all()
+
+def test_create_expense_enqueues_notification(client, db_session):
+    _create_expense_with_email(client)
+
+    messages = _outbox(db_session)
+    assert len(messages) == 1
+    assert messages[0].channel == "email"
+    assert messages[0].recipient == "friend@example.com"
+    assert messages[0].status == "pending"
+    assert messages[0].attachment_ref is not None
+
+def test_worker_delivers_and_marks_sent(client, db_session, monkeypatch):
+    _create_expense_with_email(client)
+    delivered = []
+
+    async def fake_send(message, attachment):
+        delivered.append((message["recipient"], message["payload"]["title"], attachment))
+        return True
+
+    monkeypatch.setitem(worker.SENDERS, "email", fake_send)
+    assert asyncio.run(worker.process_batch(db_session)) == 1
+
+    assert delivered == [("friend@example.com", "Team Lunch", b"%PDF-1.4 lunch")]
+    message = _outbox(db_session)[0]
+    assert message.status == "sent"
+    assert message.attempts == 1
+
+def test_worker_backs_off_then_dead_letters(client, db_session, monkeypatch):
+    _create_expense_with_email(client)
+
+    async def failing_send(message, attachment):
+        raise RuntimeError("SMTP down")
+
+    monkeypatch.setitem(worker.SENDERS, "email", failing_send)
+    monkeypatch.setattr(worker, "OUTBOX_MAX_ATTEMPTS", 2)
+
+    asyncio.run(worker.process_batch(db_session))
+    message = _outbox(db_session)[0]
+    assert message.status == "pending"
+    assert message.last_error == "SMTP down"
+    assert message.next_attempt_at > datetime.utcnow()
+
+    # Not due yet, so nothing is claimed
+    assert asyncio.run(worker.process_batch(db_session)) == 0
+
+    message.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    asyncio.run(worker.process_batch(db_session))
+    message = _outbox(db_session)[0]
+    assert message.status == "dead"
+    assert message.attempts == 2
+
+def test_worker_records_the_senders_error(client, db_session, monkeypatch):
+    _create_expense_with_email(client)
+
+    def broken_attachment(receipt_data):
+        raise ValueError("unreadable receipt")
+
+    monkeypatch.setattr(app_email, "receipt_attachment", broken_attachment)
+    asyncio.run(worker.process_batch(db_session))
+    message = _outbox(db_session)[0]
+    assert message.status == "pending"
+    assert message.last_error == "unreadable receipt"